@@ -26,9 +26,15 @@ from app.models.user_interaction import UserInteraction
 
 from .routes.course_routes import course_bp
 from .routes.user_routes import user_bp
+from .routes.admin_routes import admin_bp
+
+from .commands import course_cli, recommender_cli
 
 from .services.recommender.contentbased_model import ContentBasedModel
 from .services.recommender.collaborative_model import CollaborativeModel
+from .services.recommender.reloading import ReloadWatcher
+from .services.admin.reload_models import get_loaded_recommenders
+from .services.course.catalog_cache import check_catalog_version
 
 def create_app():
     app = Flask(__name__)
@@ -56,6 +62,17 @@ def create_app():
     db.init_app(app)
     migrate = Migrate(app, db)
     
+    # Warn when course changes would never reach the catalog cache of running workers
+    with app.app_context():
+        try:
+            catalog_warning = check_catalog_version()
+        except Exception as e:
+            catalog_warning = f"Could not check the catalog version: {str(e)}"
+        finally:
+            db.session.remove()
+    if catalog_warning:
+        print(f"WARNING: {catalog_warning}")
+    
     # JWT
     jwt = JWTManager(app)
     @app.errorhandler(NoAuthorizationError)
@@ -69,16 +86,35 @@ def create_app():
             'data': {}
         }), 401
     
-    # Initialize the ContentBasedModel singleton
-    content_based_model = ContentBasedModel()
-    print("ContentBasedModel initialized.")
+    # Recommender models load on first use unless this process preloads them
+    if app.config['RECOMMENDER_PRELOAD']:
+        # Initialize the ContentBasedModel singleton
+        content_based_model = ContentBasedModel()
+        print("ContentBasedModel initialized.")
+        
+        # Initialize the CollaborativeModel singleton
+        colaborative_model = CollaborativeModel()
+        print("ColaborativeModel initialized.")
+    
+    # Watch the model files and hot-swap retrained models in every worker
+    if app.config['RECOMMENDER_RELOAD_INTERVAL'] > 0:
+        reload_watcher = ReloadWatcher(
+            lambda: get_loaded_recommenders().values(),
+            app.config['RECOMMENDER_RELOAD_INTERVAL']
+        )
+        
+        @app.before_request
+        def start_reload_watcher():
+            # Started from the first request, so it runs in each forked worker
+            reload_watcher.ensure_started()
     
-    # Initialize the CollaborativeModel singleton
-    colaborative_model = CollaborativeModel()
-    print("ColaborativeModel initialized.")
+    # Register CLI commands
+    app.cli.add_command(recommender_cli)
+    app.cli.add_command(course_cli)
     
     # Register blueprints
     app.register_blueprint(user_bp, provide_automatic_options=True)
+    app.register_blueprint(admin_bp, url_prefix="/api/admin", provide_automatic_options=True)
     app.register_blueprint(
             course_bp,
             url_prefix="/api/courses",
@@ -0,0 +1,192 @@
+import itertools
+
+import click
+import numpy as np
+from flask.cli import AppGroup
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models.course import LISTING_SORT_COLUMNS
+from app.services.course.catalog_cache import bump_catalog_version, get_catalog_version
+from app.services.course.get_courses import build_course_listing_query
+from app.services.recommender.ann_index import BruteForceIndex, IVFFlatIndex, evaluate_index, load_or_build_index
+from app.services.recommender.artifacts import get_export_dir
+from app.services.recommender.collaborative_model import CollaborativeModel
+from app.services.recommender.contentbased_model import ContentBasedModel
+
+recommender_cli = AppGroup('recommender', help='Build and inspect recommender serving artifacts.')
+course_cli = AppGroup('courses', help='Inspect the course catalog tables.')
+
+@recommender_cli.command('build-neighbours')
+@click.option('--rebuild', is_flag=True, help='Recompute the table even if one exists for the current model version.')
+def build_neighbours(rebuild):
+    """
+    Precompute the content-based course-to-course neighbour table.
+    """
+    model = ContentBasedModel()
+    if rebuild:
+        model.rebuild_neighbours()
+    
+    n_courses, k = model.artifacts.neighbours.shape
+    click.echo(f"Neighbour table for model version {model.artifacts.version}: {n_courses} courses x top {k}")
+
+@recommender_cli.command('precompute-users')
+@click.option('--block-size', default=4096, show_default=True, help='Number of users scored per matrix product.')
+def precompute_users(block_size):
+    """
+    Precompute the collaborative top-N recommendations of every known user.
+    
+    Run it after deploying a retrained model, e.g. from a nightly job. Workers
+    serve from the table once they reload, and score live until then.
+    """
+    model = CollaborativeModel()
+    user_top = model.precompute_user_top(block_size)
+    
+    n_users, k = user_top.shape
+    click.echo(f"User table for model version {model.artifacts.version}: {n_users - 1} users x top {k}")
+
+@recommender_cli.command('index-report')
+@click.option('--model', 'model_name', type=click.Choice(['content_based', 'collaborative']), default='content_based', show_default=True)
+@click.option('--n-probe', 'n_probes', default='1,2,4,8,16', show_default=True, help='Comma-separated IVF probe counts to evaluate.')
+@click.option('--k', default=10, show_default=True, help='Number of results per query.')
+@click.option('--queries', 'n_queries', default=500, show_default=True, help='Number of sampled queries.')
+def index_report(model_name, n_probes, k, n_queries):
+    """
+    Report recall@k and latency of the IVF index against exact search.
+    
+    The IVF index is built with the configured IVF_N_LISTS (and exported for the
+    current model version) if it does not exist yet.
+    """
+    if model_name == 'content_based':
+        artifacts = ContentBasedModel().artifacts
+        queries = artifacts.candidate_embeddings
+    else:
+        artifacts = CollaborativeModel().artifacts
+        queries = artifacts.user_embeddings[1:]
+    
+    rng = np.random.default_rng(0)
+    queries = queries[rng.choice(len(queries), min(n_queries, len(queries)), replace=False)]
+    
+    exact_index = BruteForceIndex(artifacts.candidate_embeddings)
+    ivf_index = load_or_build_index(artifacts.candidate_embeddings, get_export_dir(model_name, artifacts.version), kind=IVFFlatIndex.kind)
+    
+    click.echo(f"{model_name} model version {artifacts.version}: {len(artifacts.candidate_embeddings)} candidates, "
+               f"{len(ivf_index.centroids)} lists, {len(queries)} queries, k={k}")
+    click.echo(f"{'n_probe':>8} {'recall':>8} {'ms':>8} {'p99 ms':>8} {'exact ms':>9} {'exact p99':>10}")
+    for n_probe in [int(p) for p in n_probes.split(',') if p.strip()]:
+        ivf_index.n_probe = max(1, min(n_probe, len(ivf_index.centroids)))
+        report = evaluate_index(ivf_index, exact_index, queries, k)
+        click.echo(f"{ivf_index.n_probe:>8} {report['recall']:>8.3f} {report['latency_ms']:>8.3f} {report['p99_latency_ms']:>8.3f} "
+                   f"{report['exact_latency_ms']:>9.3f} {report['exact_p99_latency_ms']:>10.3f}")
+
+@recommender_cli.command('export-network')
+@click.option('--tolerance', default=1e-4, show_default=True, help='Maximum absolute difference allowed against the Keras embeddings.')
+def export_network(tolerance):
+    """
+    Export the content-based network for the NumPy forward pass and verify it.
+    
+    Every course in the training catalog is embedded with the NumPy network and
+    compared with the candidate embeddings computed by the Keras network.
+    """
+    import pandas as pd
+    
+    model = ContentBasedModel()
+    model.export_network()
+    artifacts = model.artifacts
+    
+    courses = pd.read_csv(model.model_dir / "udemy_courses_new.csv")
+    courses = courses.set_index(courses["course_id"].astype(str)).loc[artifacts.candidate_ids]
+    embeddings = artifacts.network.embed(courses.to_dict('records'))
+    max_diff = float(np.abs(embeddings - artifacts.candidate_embeddings).max())
+    
+    click.echo(f"NumPy network for model version {artifacts.version}: {len(courses)} courses, max abs difference {max_diff:.3g}")
+    if max_diff > tolerance:
+        raise click.ClickException(f"NumPy network differs from the Keras embeddings by more than {tolerance:g}")
+
+@course_cli.command('bump-catalog-version')
+def bump_catalog_version_command():
+    """
+    Make every worker reload the course catalog.
+    
+    Run it after changing the courses table outside the app, e.g. after an
+    import. Workers notice within CATALOG_CACHE_CHECK_INTERVAL seconds.
+    """
+    bump_catalog_version()
+    db.session.commit()
+    click.echo(f"Catalog version is now {get_catalog_version()}")
+
+def _explain(sql):
+    """
+    Get the query plan of a statement on the current database.
+    
+    Returns:
+        Tuple of (whether the courses table is fully scanned, whether a whole
+        index is read without a range bound, whether rows are sorted after
+        reading them, plan summary).
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        rows = db.session.execute(text(f"EXPLAIN {sql}")).mappings().all()
+        full_scan = any(row['type'] == 'ALL' for row in rows)
+        index_scan = any(row['type'] == 'index' for row in rows)
+        filesort = any('filesort' in (row['Extra'] or '') or 'temporary' in (row['Extra'] or '') for row in rows)
+        summary = ', '.join(f"{row['type']} {row['key'] or '-'}" for row in rows)
+    elif dialect == 'sqlite':
+        details = [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        # 'SCAN courses USING INDEX ...' reads a whole index, 'SEARCH courses USING INDEX ... (subject=?)' a range
+        full_scan = any(detail in ('SCAN courses', 'SCAN TABLE courses') for detail in details)
+        index_scan = any(detail.startswith(('SCAN courses USING', 'SCAN TABLE courses USING')) for detail in details)
+        filesort = any('TEMP B-TREE' in detail for detail in details)
+        summary = ', '.join(details)
+    else:
+        raise click.ClickException(f"Query plans are not supported for the {dialect} dialect")
+    return full_scan, index_scan, filesort, summary
+
+@course_cli.command('check-plans')
+@click.option('--per-page', default=10, show_default=True, help='Page size of the listing queries.')
+def check_plans(per_page):
+    """
+    Check that every course listing filter and sort combination is served by an index.
+    
+    Every combination of the subject, level and is_paid filters with every sort
+    order is explained on the configured database. Unfiltered listings must read
+    a sort index in order. Listings filtered on a single subject or level, or on
+    is_paid, must read just the matching range of a (filter, sort) index in
+    order. Fails on anything else, e.g. after the listing indexes were dropped
+    or the listing query changed.
+    
+    Listings filtered only on several subjects and/or levels are expected to
+    sort: no index holds them in order, so their matching rows are read and
+    then sorted, or a sort index is scanned in order. They are reported as
+    'expected' and never fail, unless they scan the whole table.
+    
+    Run it against a database with production-like data, as the planner may
+    prefer a full scan of a nearly empty table.
+    """
+    subjects = [None, ['Business Finance'], ['Business Finance', 'Web Development']]
+    levels = [None, ['Beginner Level'], ['Beginner Level', 'All Levels']]
+    paid_filters = [None, 1]
+    orders = itertools.product(LISTING_SORT_COLUMNS, ['desc', 'asc'])
+    
+    failures = 0
+    for (order_by, order_direction), subject, level, is_paid in itertools.product(orders, subjects, levels, paid_filters):
+        query = build_course_listing_query(subject, level, is_paid, order_by, order_direction).limit(per_page)
+        sql = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+        full_scan, index_scan, filesort, summary = _explain(sql)
+        
+        filtered = subject or level or is_paid is not None
+        single_value_filter = len(subject or []) == 1 or len(level or []) == 1 or is_paid is not None
+        if full_scan:
+            status = 'FULL SCAN'
+        elif filesort or (filtered and index_scan):
+            status = 'expected' if not single_value_filter else 'SORT' if filesort else 'INDEX SCAN'
+        else:
+            status = 'ok'
+        failures += status not in ('ok', 'expected')
+        
+        click.echo(f"{status:<10} subject={subject} level={level} is_paid={is_paid} "
+                   f"order_by={order_by} {order_direction}: {summary}")
+    
+    if failures:
+        raise click.ClickException(f"{failures} course listing queries scan the whole table or a whole index, or sort their rows")
+    click.echo("Every course listing query reads an index range in order.")
@@ -1,6 +1,58 @@
 import os
+from pathlib import Path
 
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
\ No newline at end of file
+    JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+    
+    # Seconds a worker serves its cached course catalog before re-checking the catalog version
+    CATALOG_CACHE_CHECK_INTERVAL = float(os.getenv("CATALOG_CACHE_CHECK_INTERVAL", "5"))
+    
+    # Where GET /api/courses filters, sorts and pages: 'memory' (column store of the
+    # cached catalog) or 'sql' (indexed database queries)
+    COURSE_LISTING_BACKEND = os.getenv("COURSE_LISTING_BACKEND", "memory")
+    
+    # Recommender serving
+    # Load the recommender models at startup. Unset, this is on for serving processes
+    # and off under the `flask` CLI (migrations, one-off commands), which load lazily.
+    RECOMMENDER_PRELOAD = os.getenv("RECOMMENDER_PRELOAD", "0" if os.getenv("FLASK_RUN_FROM_CLI") else "1") == "1"
+    RECOMMENDER_EXPORT_DIR = os.getenv("RECOMMENDER_EXPORT_DIR", str(Path(__file__).parent.parent / "ml_model" / "exports"))
+    NEIGHBOUR_TABLE_SIZE = int(os.getenv("NEIGHBOUR_TABLE_SIZE", "200"))
+    USER_TOP_N_SIZE = int(os.getenv("USER_TOP_N_SIZE", "200"))
+    
+    # Hot reload of retrained models: poll the model files every N seconds (0 disables),
+    # or POST /api/admin/recommender/reload with the X-Admin-Token header
+    RECOMMENDER_RELOAD_INTERVAL = float(os.getenv("RECOMMENDER_RELOAD_INTERVAL", "0"))
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+    
+    # Users missing from the collaborative model are folded in from their interactions,
+    # cached per worker for this many seconds
+    COLD_START_CACHE_TTL = float(os.getenv("COLD_START_CACHE_TTL", "300"))
+    COLD_START_CACHE_SIZE = int(os.getenv("COLD_START_CACHE_SIZE", "10000"))
+    
+    # Hybrid recommender: content-based weight for users with many interactions, the number
+    # of interactions over which the extra content weight of new users halves, and the
+    # number of candidates pulled from each index
+    HYBRID_CONTENT_WEIGHT = float(os.getenv("HYBRID_CONTENT_WEIGHT", "0.3"))
+    HYBRID_CONTENT_WEIGHT_HALF_LIFE = float(os.getenv("HYBRID_CONTENT_WEIGHT_HALF_LIFE", "5"))
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "200"))
+    
+    # Shared cache of recommender responses, in Redis in production (the limiter's REDIS_URL)
+    # and per worker otherwise. A TTL of 0 disables it.
+    RESULT_CACHE_REDIS_URL = os.getenv("REDIS_URL") if os.getenv("FLASK_ENV") == "production" else None
+    RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "60"))
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+    # Seconds a computing worker holds the lock of a missing key, and how often waiting ones poll
+    RESULT_CACHE_LOCK_TIMEOUT = float(os.getenv("RESULT_CACHE_LOCK_TIMEOUT", "10"))
+    RESULT_CACHE_POLL_INTERVAL = float(os.getenv("RESULT_CACHE_POLL_INTERVAL", "0.02"))
+    RESULT_CACHE_SOCKET_TIMEOUT = float(os.getenv("RESULT_CACHE_SOCKET_TIMEOUT", "0.5"))
+    
+    # Micro-batching of concurrent recommender queries, disabled when the window is 0
+    RECOMMENDER_BATCH_WINDOW_MS = float(os.getenv("RECOMMENDER_BATCH_WINDOW_MS", "0"))
+    RECOMMENDER_MAX_BATCH_SIZE = int(os.getenv("RECOMMENDER_MAX_BATCH_SIZE", "32"))
+    
+    # Candidate index used for live retrieval: 'brute_force' (exact) or 'ivf_flat' (approximate)
+    RECOMMENDER_INDEX = os.getenv("RECOMMENDER_INDEX", "brute_force")
+    IVF_N_LISTS = int(os.getenv("IVF_N_LISTS", "0"))  # 0 picks sqrt(n_candidates)
+    IVF_N_PROBE = int(os.getenv("IVF_N_PROBE", "8"))
@@ -0,0 +1,15 @@
+from app.extensions import db
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_versions'
+    
+    # Single row (id=1) counting changes to the courses table, so every worker
+    # can tell when its cached copy of the catalog is stale
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'version': self.version
+        }
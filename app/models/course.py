@@ -1,7 +1,23 @@
 from app.extensions import db
 
+# Columns GET /api/courses can sort on
+LISTING_SORT_COLUMNS = ['num_subscribers', 'num_reviews', 'total_interactions', 'total_users']
+
+# Columns GET /api/courses can filter on
+LISTING_FILTER_COLUMNS = ['subject', 'level', 'is_paid']
+
 class Course(db.Model):
     __tablename__ = 'courses'
+    # Listing indexes: one per sort column for unfiltered listings, which read the
+    # index in order and stop after a page, and one led by each filter column per
+    # sort column, so a listing filtered on one value reads just that range in
+    # order. The primary key stored in every secondary index breaks ties.
+    __table_args__ = tuple(
+        db.Index(f'ix_courses_{column}', column) for column in LISTING_SORT_COLUMNS
+    ) + tuple(
+        db.Index(f'ix_courses_{filter_column}_{column}', filter_column, column)
+        for filter_column in LISTING_FILTER_COLUMNS for column in LISTING_SORT_COLUMNS
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, index=True, unique=True, nullable=False)
@@ -22,7 +38,11 @@ class Course(db.Model):
     
     interactions = db.relationship('UserInteraction', back_populates='course', lazy='dynamic')
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        # Only the given fields, so columns left out of a load_only query are never loaded
+        if fields is not None:
+            return {field: getattr(self, field) for field in fields}
+        
         return {
             'id': self.id,
             'course_id': self.course_id,
@@ -0,0 +1,74 @@
+import hmac
+
+from flask import Blueprint, current_app, request, jsonify
+
+from app.services.admin.reload_models import RECOMMENDER_MODELS, get_recommender_versions, reload_recommenders
+
+admin_bp = Blueprint('admin_bp', __name__)
+
+@admin_bp.before_request
+def check_admin_token():
+    """
+    Require the X-Admin-Token header to match ADMIN_TOKEN on every admin endpoint.
+    """
+    admin_token = current_app.config.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin endpoints are disabled',
+            'data': {}
+        }), 403
+    
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid admin token',
+            'data': {}
+        }), 401
+
+@admin_bp.route('/recommender/versions', methods=['GET'])
+def get_recommender_versions_route():
+    try:
+        return jsonify({
+            'status': 'success',
+            'message': 'Successfully fetched recommender model versions',
+            'data': get_recommender_versions()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error fetching recommender model versions: {str(e)}',
+            'data': {}
+        }), 500
+
+@admin_bp.route('/recommender/reload', methods=['POST'])
+def reload_recommenders_route():
+    """
+    Reload retrained recommender models in the background.
+    
+    Only reloads the worker process that receives the request. Use
+    RECOMMENDER_RELOAD_INTERVAL to have every worker pick up new model files.
+    """
+    # Parse models to support comma-separated values
+    models = request.args.get('models', default=','.join(RECOMMENDER_MODELS), type=str)
+    models = [m.strip() for m in models.split(',') if m.strip()]
+    
+    try:
+        versions = reload_recommenders(models)
+        return jsonify({
+            'status': 'success',
+            'message': f'Reloading {len(versions)} recommender models',
+            'data': versions
+        }), 202
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'data': {}
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error reloading recommender models: {str(e)}',
+            'data': {}
+        }), 500
@@ -1,15 +1,37 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort
 from jsonschema import validate, ValidationError
 from flask_jwt_extended import get_jwt_identity
 from flask_jwt_extended import jwt_required
 
-from app.services.course.get_courses import get_all_courses, get_course_by_id, get_random_courses, get_recommended_courses_by_course_id, get_recommended_courses_by_user_id, get_courses
+from app.services.course.get_courses import get_all_courses, get_course_by_id, get_random_courses, get_recommended_courses_by_course_id, get_recommended_courses_by_course_ids, get_recommended_courses_by_user_id, get_recommended_courses_for_user, get_hybrid_recommended_courses_for_user, get_courses, get_course_facets
 from app.services.course.create_courses import create_courses
+from app.services.course.course_json import course_json_response
+from app.services.course.fields import parse_course_fields
+from app.services.course.pagination import InvalidCursorError
 from app.models.course_schema import add_courses_schema
 from app.services.user.get_user import get_user_by_username
 
 course_bp = Blueprint('course_bp', __name__)
 
+# Requests aborted with 400 Bad Request get the same JSON shape as every other error
+@course_bp.errorhandler(400)
+def bad_request_error(e):
+    return jsonify({
+        'status': 'error',
+        'message': e.description,
+        'data': {}
+    }), 400
+
+def get_course_fields():
+    """
+    Read the fields= parameter of the course endpoints.
+    Aborts with 400 Bad Request if it names unknown course fields, so call it before the route's try block.
+    """
+    fields, unknown_fields = parse_course_fields(request.args.get('fields', default=None, type=str))
+    if unknown_fields:
+        abort(400, description=f'Unknown course fields: {", ".join(unknown_fields)}')
+    return fields
+
 @course_bp.route('', methods=['GET'])
 def get_courses_route():
     # Subject mapping:
@@ -29,6 +51,8 @@ def get_courses_route():
     
     # Order by num_subscribers, num_reviews, total_interactions, and total_users
     
+    fields = get_course_fields()
+    
     try:
         page = request.args.get('page', default=1, type=int)
         per_page = request.args.get('per_page', default=10, type=int)
@@ -46,21 +70,31 @@ def get_courses_route():
         order_by = request.args.get('order_by', default='num_subscribers', type=str)
         order_direction = request.args.get('order_direction', default='desc', type=str)
         search_query = request.args.get('search', default=None, type=str)
-
-        courses_paginate = get_courses(page, per_page, subject, level, is_paid, order_by, order_direction, search_query)
+        
+        # Cursor pagination: pass cursor= (empty) for the first page, then next_cursor
+        cursor = request.args.get('cursor', default=None, type=str)
+        include_total = request.args.get('include_total', default=1, type=int) != 0
+        
+        courses_paginate = get_courses(page, per_page, subject, level, is_paid, order_by, order_direction, search_query, cursor, include_total, fields)
         courses_number = len(courses_paginate['courses'])
         
-        return jsonify({
+        return course_json_response({
             'status': 'success',
             'message': f'Successfully fetched {courses_number} courses',
             'data': courses_paginate
-        }), 200
+        }, fields), 200
     except ValidationError as e:
         return jsonify({
             'status': 'error',
             'message': f'Validation error: {e.message}',
             'data': {}
         }), 400
+    except InvalidCursorError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'data': {}
+        }), 400
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -68,16 +102,47 @@ def get_courses_route():
             'data': {}
         }), 500
 
+@course_bp.route('/facets', methods=['GET'])
+def get_course_facets_route():
+    # Same subject, level, is_paid and search filters as GET /api/courses
+    try:
+        subject = request.args.get('subject', default=None, type=str)
+        if subject:
+            subject = [int(s) for s in subject.split(',') if s.isdigit()]
+        
+        level = request.args.get('level', default=None, type=str)
+        if level:
+            level = [int(l) for l in level.split(',') if l.isdigit()]
+        
+        is_paid = request.args.get('is_paid', default=None, type=int)
+        search_query = request.args.get('search', default=None, type=str)
+        
+        facets = get_course_facets(subject, level, is_paid, search_query)
+        
+        return jsonify({
+            'status': 'success',
+            'message': f'Successfully counted {facets["total"]} courses',
+            'data': facets
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error counting courses: {str(e)}',
+            'data': {}
+        }), 500
+
 @course_bp.route('/<int:course_id>', methods=['GET'])
 def get_course_by_id_route(course_id):
+    fields = get_course_fields()
+    
     try:
-        course = get_course_by_id(course_id)
+        course = get_course_by_id(course_id, fields)
         if course:
-            return jsonify({
+            return course_json_response({
                 'status': 'success',
                 'message': f'Successfully fetched course with ID {course_id}',
                 'data': course
-                }), 200
+                }, fields), 200
         else:
             return jsonify({
                 'status': 'error',
@@ -93,14 +158,17 @@ def get_course_by_id_route(course_id):
     
 @course_bp.route('/random', methods=['GET'])
 def get_random_courses_route():
+    fields = get_course_fields()
+    
     try:
         n = request.args.get('n', default=2, type=int)
-        courses = get_random_courses(n)
-        return jsonify({
+        seed = request.args.get('seed', default=None, type=int)
+        courses = get_random_courses(n, seed, fields)
+        return course_json_response({
             'status': 'success',
             'message': f'Successfully fetched {n} random courses of each subject',
             'data': courses
-            }), 200
+            }, fields), 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -110,6 +178,8 @@ def get_random_courses_route():
         
 @course_bp.route('/recommender1', methods=['GET'])
 def get_recommended_courses_1_route():
+    fields = get_course_fields()
+    
     try:
         course_id = request.args.get('course_id', default=1, type=int)
         n = request.args.get('n', default=5, type=int)
@@ -125,13 +195,14 @@ def get_recommended_courses_1_route():
         if n > 1000:
             n = 1000  # Limit n to a maximum of 1000
         
-        courses = get_recommended_courses_by_course_id(course_id, n)
+        courses, model_version = get_recommended_courses_by_course_id(course_id, n, fields)
         
-        return jsonify({
+        return course_json_response({
             'status': 'success',
             'message': f'Successfully fetched {len(courses)} recommended courses for course ID {course_id}',
-            'data': courses
-            }), 200
+            'data': courses,
+            'model_version': model_version
+            }, fields), 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -139,9 +210,61 @@ def get_recommended_courses_1_route():
             'data': {}
             }), 500
         
+@course_bp.route('/recommender1/batch', methods=['GET'])
+def get_recommended_courses_1_batch_route():
+    fields = get_course_fields()
+    
+    try:
+        # Parse course_ids to support comma-separated values
+        course_ids = request.args.get('course_ids', default='', type=str)
+        course_ids = [int(c) for c in course_ids.split(',') if c.strip().isdigit()]
+        n = request.args.get('n', default=5, type=int)
+        
+        # Sanity check for course_ids and n
+        if not course_ids:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameter course_ids must contain at least one course ID',
+                'data': {}
+                }), 400
+        
+        if len(course_ids) > 50:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameter course_ids accepts at most 50 course IDs',
+                'data': {}
+                }), 400
+        
+        if n <= 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameter n must be a positive integer',
+                'data': {}
+                }), 400
+        
+        if n > 1000:
+            n = 1000  # Limit n to a maximum of 1000
+        
+        courses, model_version = get_recommended_courses_by_course_ids(course_ids, n, fields)
+        
+        return course_json_response({
+            'status': 'success',
+            'message': f'Successfully fetched recommended courses for {len(courses["seeds"])} course IDs',
+            'data': courses,
+            'model_version': model_version
+            }, fields), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error fetching recommended courses for course IDs {course_ids}: {str(e)}',
+            'data': {}
+            }), 500
+        
 # Colaborative test
 @course_bp.route('/recommender2', methods=['GET'])
 def get_recommended_courses_2_route():
+    fields = get_course_fields()
+    
     try:
         user_id = request.args.get('user_id', default='user_1', type=str)
         n = request.args.get('n', default=5, type=int)
@@ -157,13 +280,14 @@ def get_recommended_courses_2_route():
         if n > 1000:
             n = 1000  # Limit n to a maximum of 1000
         
-        courses = get_recommended_courses_by_user_id(user_id, n)
+        courses, model_version = get_recommended_courses_by_user_id(user_id, n, fields)
         
-        return jsonify({
+        return course_json_response({
             'status': 'success',
             'message': f'Successfully fetched {len(courses)} recommended courses for user ID {user_id}',
-            'data': courses
-            }), 200
+            'data': courses,
+            'model_version': model_version
+            }, fields), 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -179,6 +303,8 @@ def get_recommended_courses_3_route():
     Get recommended courses for a user based on their user_id.
     This endpoint is intended to be used with an authenticated user.
     """
+    fields = get_course_fields()
+    
     try:
         n = request.args.get('n', default=5, type=int)
         # Sanity check for n
@@ -203,15 +329,15 @@ def get_recommended_courses_3_route():
             }), 404
         
         user_id = user['id']
-        formatted_user_id = f'user_{user_id}'
         
-        courses = get_recommended_courses_by_user_id(formatted_user_id, n)
+        courses, model_version = get_recommended_courses_for_user(user, n, fields)
         
-        return jsonify({
+        return course_json_response({
             'status': 'success',
             'message': f'Successfully fetched {len(courses)} recommended courses for user ID {user_id}',
-            'data': courses
-            }), 200
+            'data': courses,
+            'model_version': model_version
+            }, fields), 200
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -219,6 +345,65 @@ def get_recommended_courses_3_route():
             'data': {}
             }), 500
 
+# Authed hybrid recommender, fuses content-based and collaborative scores for the user from auth
+@course_bp.route('/recommender4', methods=['GET'])
+@jwt_required()
+def get_recommended_courses_4_route():
+    """
+    Get recommended courses for a user from both recommenders in one pass.
+    This endpoint is intended to be used with an authenticated user.
+    """
+    fields = get_course_fields()
+    
+    try:
+        n = request.args.get('n', default=5, type=int)
+        content_weight = request.args.get('content_weight', default=None, type=float)
+        
+        # Sanity check for n and content_weight
+        if n <= 0:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameter n must be a positive integer',
+                'data': {}
+                }), 400
+        
+        if n > 200:
+            n = 200  # Limit n to a maximum of 200
+        
+        if content_weight is not None and not 0 <= content_weight <= 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameter content_weight must be between 0 and 1',
+                'data': {}
+                }), 400
+        
+        username = get_jwt_identity()
+        user = get_user_by_username(username)
+        
+        if not user:
+            return jsonify({
+                'status': 'error',
+                'message': 'User not found',
+                'data': {}
+            }), 404
+        
+        user_id = user['id']
+        
+        courses, model_version = get_hybrid_recommended_courses_for_user(user, n, content_weight, fields)
+        
+        return course_json_response({
+            'status': 'success',
+            'message': f'Successfully fetched {len(courses)} hybrid recommended courses for user ID {user_id}',
+            'data': courses,
+            'model_version': model_version
+            }, fields), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error fetching hybrid recommended courses: {str(e)}',
+            'data': {}
+            }), 500
+
 # Should not be needed in the current version
 # @course_bp.route('/', methods=['POST'])
 # def post_course():
@@ -0,0 +1,44 @@
+from app.services.recommender.contentbased_model import ContentBasedModel
+from app.services.recommender.collaborative_model import CollaborativeModel
+
+RECOMMENDER_MODELS = {
+    'content_based': ContentBasedModel,
+    'collaborative': CollaborativeModel,
+}
+
+def get_loaded_recommenders():
+    """
+    Get the recommender singletons this process has loaded so far.
+    
+    :return: Dict of model name to model instance.
+    """
+    return {name: model_class._instance for name, model_class in RECOMMENDER_MODELS.items() if model_class._instance}
+
+def get_recommender_versions():
+    """
+    Get the model version each loaded recommender is serving.
+    
+    :return: Dict of model name to model version.
+    """
+    return {name: model.artifacts.version for name, model in get_loaded_recommenders().items()}
+
+def reload_recommenders(model_names):
+    """
+    Start reloading recommenders in the background.
+    
+    The models keep serving their current version until the new one is built,
+    which is then swapped in atomically.
+    
+    :param model_names: Names of the models to reload, from RECOMMENDER_MODELS.
+    :return: Dict of model name to the version served while reloading.
+    """
+    unknown = [name for name in model_names if name not in RECOMMENDER_MODELS]
+    if unknown:
+        raise ValueError(f"Unknown recommender models: {', '.join(unknown)}")
+    
+    versions = {}
+    for name in model_names:
+        model = RECOMMENDER_MODELS[name]()
+        model.reload_in_background()
+        versions[name] = model.artifacts.version
+    return versions
@@ -0,0 +1,113 @@
+import time
+from threading import Lock
+from types import MappingProxyType
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import Config
+from app.extensions import db
+from app.models.catalog_version import CatalogVersion
+from app.models.course import Course
+
+class CatalogSnapshot:
+    """
+    One immutable copy of the course catalog.
+
+    Records are read-only mappings, so the same snapshot can be shared by
+    every request thread. A newer catalog version replaces the whole snapshot.
+    """
+
+    def __init__(self, version, courses):
+        self.version = version
+        self.course_by_id = {course.course_id: MappingProxyType(course.to_dict()) for course in courses}
+
+_snapshot = None
+_checked_at = 0.0
+_load_lock = Lock()
+
+def get_catalog_version():
+    """
+    Read the catalog version counter.
+
+    :return: The current catalog version, 0 if it was never bumped
+    """
+    return db.session.query(CatalogVersion.version).filter_by(id=1).scalar() or 0
+
+def bump_catalog_version():
+    """
+    Increment the catalog version counter in the current transaction.
+
+    Call it from every write to the courses table, before committing, so all
+    workers drop their cached catalog.
+    """
+    updated = CatalogVersion.query.filter_by(id=1).update(
+        {CatalogVersion.version: CatalogVersion.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CatalogVersion(id=1, version=1))
+
+def check_catalog_version():
+    """
+    Check that catalog changes will reach the workers through the version counter.
+
+    Workers only reload the catalog when the counter moves, and only create_courses
+    moves it. A counter that is missing, or still at 0 while there are courses,
+    means courses were loaded directly into the database without a bump.
+
+    :return: A warning message, or None if the counter is in use
+    """
+    try:
+        version = db.session.query(CatalogVersion.version).filter_by(id=1).scalar()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return "The catalog_versions table is missing, run 'flask db upgrade'. Course changes will not reach running workers."
+
+    if not version and db.session.query(Course.id).first() is not None:
+        return ("The catalog version was never bumped, so course changes made directly in the database "
+                "will not reach running workers. Run 'flask courses bump-catalog-version' after every import.")
+    return None
+
+def invalidate_catalog():
+    """
+    Force the next catalog access of this worker to re-check the version counter.
+    """
+    global _checked_at
+    _checked_at = 0.0
+
+def get_catalog():
+    """
+    Get the cached course catalog, loading it with one bulk query when the
+    version counter moved.
+
+    The version counter is read at most every CATALOG_CACHE_CHECK_INTERVAL
+    seconds, so most requests do not touch the database at all.
+
+    :return: The current CatalogSnapshot
+    """
+    global _snapshot, _checked_at
+
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _checked_at < Config.CATALOG_CACHE_CHECK_INTERVAL:
+        return snapshot
+
+    with _load_lock:
+        snapshot = _snapshot
+        if snapshot is not None and time.monotonic() - _checked_at < Config.CATALOG_CACHE_CHECK_INTERVAL:
+            return snapshot
+
+        version = get_catalog_version()
+        if snapshot is None or snapshot.version != version:
+            snapshot = CatalogSnapshot(version, Course.query.order_by(Course.id).all())
+            _snapshot = snapshot
+        _checked_at = time.monotonic()
+        return snapshot
+
+def get_course_record(course_id):
+    """
+    Get one cached course record.
+
+    :param course_id: The course_id (not the primary key)
+    :return: The read-only course record, or None if the course does not exist
+    """
+    return get_catalog().course_by_id.get(int(course_id))
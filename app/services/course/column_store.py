@@ -0,0 +1,213 @@
+from threading import Lock
+
+import numpy as np
+
+from app.models.course import LISTING_SORT_COLUMNS
+from app.services.course.catalog_cache import get_catalog
+
+# Stand-in for NULL in the sort columns
+NULL_SORT_VALUE = np.iinfo(np.int64).min
+
+class CourseColumnStore:
+    """
+    Column arrays of one catalog snapshot for listing courses without the database.
+
+    Courses are rows in catalog order. Every sort column has a precomputed
+    permutation in ascending (value, id) order, and every subject, level and
+    is_paid value a boolean row mask, so filtering, sorting and paging are
+    array operations.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.records = list(catalog.course_by_id.values())
+        self.ids = np.array([course['id'] for course in self.records], dtype=np.int64)
+        self.course_ids = np.array([course['course_id'] for course in self.records], dtype=np.int64)
+
+        # NULLs sort before every value, as in the database
+        self.columns = {
+            column: np.array(
+                [NULL_SORT_VALUE if course[column] is None else course[column] for course in self.records],
+                dtype=np.int64
+            )
+            for column in LISTING_SORT_COLUMNS
+        }
+        self.orders = {
+            column: np.lexsort((self.ids, values)) for column, values in self.columns.items()
+        }
+
+        self.masks = {
+            'subject': self._value_masks('subject'),
+            'level': self._value_masks('level'),
+            'is_paid': self._value_masks('is_paid'),
+        }
+        # Masks of each facet stacked into one (n_values, n_rows) matrix to count all values at once.
+        # An empty catalog has no values, so its matrices are (0, 0).
+        n_rows = len(self.records)
+        self.facet_values = {column: list(masks) for column, masks in self.masks.items()}
+        self.facet_matrices = {
+            column: np.stack(list(masks.values())) if masks else np.zeros((0, n_rows), dtype=bool)
+            for column, masks in self.masks.items()
+        }
+        # Position of each row's value in facet_values, to group rows by value
+        self.codes = {
+            column: matrix.argmax(axis=0) if len(matrix) else np.zeros(n_rows, dtype=np.intp)
+            for column, matrix in self.facet_matrices.items()
+        }
+
+    def _value_masks(self, column):
+        values = np.array([course[column] for course in self.records], dtype=object)
+        return {value: values == value for value in dict.fromkeys(values.tolist())}
+
+    def _any_of(self, column, values):
+        # Rows matching any of the values, values missing from the catalog match nothing
+        mask = np.zeros(len(self.records), dtype=bool)
+        for value in values:
+            value_mask = self.masks[column].get(value)
+            if value_mask is not None:
+                mask |= value_mask
+        return mask
+
+    def get_course_id_mask(self, course_ids):
+        """
+        Get the rows of a set of courses, e.g. search results.
+
+        :param course_ids: Iterable of course_id
+        :return: Boolean array over the rows
+        """
+        return np.isin(self.course_ids, np.fromiter(course_ids, dtype=np.int64))
+
+    def get_mask(self, subject=None, level=None, is_paid=None):
+        """
+        Get the rows matching the listing filters.
+
+        :param subject: List of subject names to keep, or None
+        :param level: List of level names to keep, or None
+        :param is_paid: 1 or 0 to keep paid or free courses, or None
+        :return: Boolean array over the rows
+        """
+        mask = np.ones(len(self.records), dtype=bool)
+        if subject:
+            mask &= self._any_of('subject', subject)
+        if level:
+            mask &= self._any_of('level', level)
+        if is_paid is not None:
+            mask &= self._any_of('is_paid', [bool(is_paid)])
+        return mask
+
+    def get_facet_counts(self, subject=None, level=None, is_paid=None, mask=None):
+        """
+        Count the rows per subject, level and is_paid value.
+
+        Each facet is counted under every filter except its own, so the counts
+        tell how many courses selecting another value of that facet would add.
+
+        :param subject: List of subject names to keep, or None
+        :param level: List of level names to keep, or None
+        :param is_paid: 1 or 0 to keep paid or free courses, or None
+        :param mask: Optional boolean array of rows to count within, e.g. search results
+        :return: Tuple of (dict of facet to dict of value to count, number of rows
+            matching every filter)
+        """
+        base = mask if mask is not None else np.ones(len(self.records), dtype=bool)
+        filters = {
+            'subject': self._any_of('subject', subject) if subject else None,
+            'level': self._any_of('level', level) if level else None,
+            'is_paid': self._any_of('is_paid', [bool(is_paid)]) if is_paid is not None else None,
+        }
+
+        counts = {}
+        for column in filters:
+            rows = base.copy()
+            for other, other_mask in filters.items():
+                if other != column and other_mask is not None:
+                    rows &= other_mask
+            value_counts = np.count_nonzero(self.facet_matrices[column] & rows, axis=1)
+            counts[column] = dict(zip(self.facet_values[column], value_counts.tolist()))
+
+        rows = base.copy()
+        for filter_mask in filters.values():
+            if filter_mask is not None:
+                rows &= filter_mask
+        return counts, int(rows.sum())
+
+    def sample_rows(self, column, values, n, rng):
+        """
+        Draw up to n random rows for each of several values of a facet in one pass.
+
+        All rows are shuffled once and stably grouped by value, so the first n
+        rows of each group are a uniform sample without replacement.
+
+        :param column: The facet, e.g. 'subject'
+        :param values: The values to sample, in output order
+        :param n: Rows per value
+        :param rng: The numpy.random.Generator to draw with
+        :return: Array of rows, grouped by value in the order of values
+        """
+        shuffled = rng.permutation(len(self.records))
+        codes = self.codes[column][shuffled]
+        by_value = np.argsort(codes, kind='stable')
+        grouped = shuffled[by_value]
+        # Group boundaries: rows of value i are grouped[starts[i]:starts[i + 1]]
+        starts = np.searchsorted(codes[by_value], np.arange(len(self.facet_values[column]) + 1))
+
+        samples = []
+        for value in values:
+            if value in self.masks[column]:
+                code = self.facet_values[column].index(value)
+                samples.append(grouped[starts[code]:min(starts[code] + n, starts[code + 1])])
+        return np.concatenate(samples) if samples else np.empty(0, dtype=np.int64)
+
+    def get_ordered_rows(self, mask, order_by, order_direction, after=None):
+        """
+        Get the rows of a mask in listing order.
+
+        :param mask: Boolean array over the rows, from get_mask
+        :param order_by: The sort column
+        :param order_direction: 'asc' or 'desc'
+        :param after: Optional (value, id) sort key, as validated by decode_cursor.
+            Only rows strictly after it in listing order are returned.
+        :return: Array of rows, ties broken by id in the same direction
+        """
+        order = self.orders[order_by]
+        start, end = 0, len(order)
+        if after is not None:
+            # Split the ascending order around the key: rows with the same value are
+            # ordered by id, so the split inside them is found by id
+            value, id = after
+            if value is None:
+                value = NULL_SORT_VALUE
+            sorted_values = self.columns[order_by][order]
+            low = np.searchsorted(sorted_values, value, 'left')
+            high = np.searchsorted(sorted_values, value, 'right')
+            sorted_ids = self.ids[order[low:high]]
+            if order_direction == 'desc':
+                end = low + np.searchsorted(sorted_ids, id, 'left')
+            else:
+                start = low + np.searchsorted(sorted_ids, id, 'right')
+
+        order = order[start:end]
+        if order_direction == 'desc':
+            order = order[::-1]
+        return order[mask[order]]
+
+_store = None
+_store_lock = Lock()
+
+def get_column_store():
+    """
+    Get the column store of the current catalog, rebuilding it when the catalog changed.
+
+    :return: The CourseColumnStore
+    """
+    global _store
+
+    catalog = get_catalog()
+    store = _store
+    if store is None or store.catalog is not catalog:
+        with _store_lock:
+            store = _store
+            if store is None or store.catalog is not catalog:
+                store = CourseColumnStore(catalog)
+                _store = store
+    return store
@@ -0,0 +1,134 @@
+import json
+from threading import Lock
+
+from flask import current_app
+
+from app.services.course.catalog_cache import get_catalog
+from app.services.course.fields import COURSE_FIELDS
+
+# Same output as jsonify in production: sorted keys, compact, ASCII only
+_dumps = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=True).encode
+
+_COURSE_KEYS = frozenset(COURSE_FIELDS)
+_SCORED_COURSE_KEYS = _COURSE_KEYS | {'score'}
+
+_CONTAINERS = (dict, list, tuple)
+
+# With sorted keys 'score' lands between 'published_timestamp' and 'subject'
+_SCORE_SPLIT = b',"subject":'
+
+class CourseFragments:
+    """
+    The JSON encoding of every course of one catalog snapshot.
+
+    Each fragment is stored split at the position of the recommender 'score'
+    key, so scored courses are assembled without encoding them again. A
+    fragment only stands in for a dict holding exactly the catalog's values,
+    so courses from anywhere else, e.g. the SQL listing backend or an older
+    cached response, are encoded from their own values.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.parts = {}
+        for course_id, course in catalog.course_by_id.items():
+            record = dict(course)
+            fragment = _dumps(record).encode()
+            split = fragment.index(_SCORE_SPLIT)
+            # Equal values of another type, e.g. 1 for True, encode differently
+            self.parts[course_id] = (record, tuple(map(type, record.values())), fragment[:split], fragment[split:])
+
+    def encode(self, course):
+        """
+        Get the JSON of a course dict from its cached fragment.
+
+        :param course: A course dict with all fields, and optionally a 'score' as last key
+        :return: The JSON bytes, or None if the course has no fragment or its
+            values differ from the catalog's
+        """
+        parts = self.parts.get(course['course_id'])
+        if parts is None:
+            return None
+        record, types, head, tail = parts
+        if 'score' in course:
+            score = course['score']
+            if (
+                next(reversed(course)) != 'score' or tuple(map(type, course.values()))[:-1] != types
+                or {**record, 'score': score} != course
+            ):
+                return None
+            return head + b',"score":' + _dumps(score).encode() + tail
+        if tuple(map(type, course.values())) != types or course != record:
+            return None
+        return head + tail
+
+_fragments = None
+_fragments_lock = Lock()
+
+def get_course_fragments():
+    """
+    Get the course JSON fragments of the current catalog, encoding them when the catalog changed.
+
+    :return: The CourseFragments
+    """
+    global _fragments
+
+    catalog = get_catalog()
+    fragments = _fragments
+    if fragments is None or fragments.catalog is not catalog:
+        with _fragments_lock:
+            fragments = _fragments
+            if fragments is None or fragments.catalog is not catalog:
+                fragments = CourseFragments(catalog)
+                _fragments = fragments
+    return fragments
+
+def _encode(value, fragments):
+    if isinstance(value, dict):
+        keys = value.keys()
+        # Complete course dicts mostly come from the catalog, so their JSON is already cached
+        if keys == _COURSE_KEYS or keys == _SCORED_COURSE_KEYS:
+            encoded = fragments.encode(value)
+            return encoded if encoded is not None else _dumps(value).encode()
+        if not any(isinstance(item, _CONTAINERS) for item in value.values()):
+            return _dumps(value).encode()
+        # Non-string keys are converted like json does, after sorting
+        return b'{' + b','.join(
+            _dumps(key if isinstance(key, str) else _dumps(key)).encode() + b':' + _encode(value[key], fragments)
+            for key in sorted(value)
+        ) + b'}'
+    if isinstance(value, _CONTAINERS):
+        if not any(isinstance(item, _CONTAINERS) for item in value):
+            return _dumps(value).encode()
+        return b'[' + b','.join(_encode(item, fragments) for item in value) + b']'
+    return _dumps(value).encode()
+
+def course_json_response(payload, fields=None):
+    """
+    Build a JSON response whose course dicts are copied from pre-encoded fragments.
+
+    The body is byte-identical to jsonify(payload). Containers holding other
+    containers, like the {status, message, data} envelope, are walked down to
+    the course dicts; any other value is encoded with one json call. Payloads of
+    projected courses have no fragments and are passed to jsonify, as is
+    everything when the app pretty-prints or otherwise customises JSON, e.g.
+    in debug mode.
+
+    :param payload: The response payload
+    :param fields: The fields the courses were projected to, or None for all fields
+    :return: The Flask response
+    """
+    provider = current_app.json
+    if (
+        fields is not None
+        or provider.compact is False or (provider.compact is None and current_app.debug)
+        or not provider.sort_keys or not provider.ensure_ascii
+    ):
+        return provider.response(payload)
+
+    try:
+        body = _encode(payload, get_course_fragments()) + b'\n'
+    except TypeError:
+        # Values only the app's JSON provider can encode, e.g. dates
+        return provider.response(payload)
+    return current_app.response_class(body, mimetype=provider.mimetype)
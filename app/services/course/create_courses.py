@@ -1,5 +1,6 @@
 from app.models.course import Course
 from app.extensions import db
+from app.services.course.catalog_cache import bump_catalog_version, invalidate_catalog
 
 def create_courses(courses):
     try:
@@ -22,7 +23,11 @@ def create_courses(courses):
                 image_banner_url=course['image_banner_url'] 
             )
             db.session.add(new_course)
+        
+        # Committed with the courses, so every worker reloads its cached catalog
+        bump_catalog_version()
         db.session.commit()
+        invalidate_catalog()
     except Exception as e:
         db.session.rollback()
         raise e
@@ -0,0 +1,35 @@
+# Keys of Course.to_dict(), in order
+COURSE_FIELDS = [
+    'id', 'course_id', 'course_title', 'url', 'is_paid', 'price', 'num_subscribers',
+    'num_reviews', 'num_lectures', 'level', 'content_duration', 'published_timestamp',
+    'subject', 'total_interactions', 'total_users', 'image_banner_url'
+]
+
+def parse_course_fields(fields):
+    """
+    Parse the fields= parameter of the course endpoints.
+
+    :param fields: Comma-separated course fields, e.g. 'course_id,course_title,price', or None
+    :return: Tuple of (list of requested fields in to_dict order, or None for all fields;
+        list of unknown fields)
+    """
+    if not fields:
+        return None, []
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in COURSE_FIELDS]
+    return [field for field in COURSE_FIELDS if field in requested] or None, unknown
+
+def project_courses(courses, fields):
+    """
+    Keep only some fields of course dicts. Recommender scores are always kept.
+
+    :param courses: List of course dicts
+    :param fields: Fields to keep, or None to keep all
+    :return: List of course dicts
+    """
+    if fields is None:
+        return courses
+
+    keep = set(fields) | {'score'}
+    return [{key: value for key, value in course.items() if key in keep} for course in courses]
@@ -1,12 +1,70 @@
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+
 from app.models.course import Course
-from app.extensions import db
+from app.config import Config
+from app.services.course.catalog_cache import get_catalog, get_course_record
+from app.services.course.column_store import get_column_store
+from app.services.course.fields import project_courses
+from app.services.course.pagination import decode_cursor, encode_cursor
+from app.services.course.search_index import search_courses
 from app.services.recommender.contentbased_model import ContentBasedModel
 from app.services.recommender.collaborative_model import CollaborativeModel
+from app.services.recommender.user_fold_in import get_user_profile
+from app.services.recommender.hybrid import get_hybrid_recommendations
+from app.services.recommender.result_cache import get_cached_recommendations
+
+SUBJECT_MAPPING = {
+    1: 'Business Finance',
+    2: 'Graphic Design',
+    3: 'Web Development',
+    4: 'Musical Instruments'
+}
+
+LEVEL_MAPPING = {
+    1: 'Beginner Level',
+    2: 'Intermediate Level',
+    3: 'Expert Level',
+    0: 'All Levels'
+}
+
+PAID_MAPPING = {
+    1: 'Paid',
+    0: 'Free'
+}
+
+def map_course_filters(subject, level, is_paid):
+    """
+    Turn the numeric subject, level and is_paid codes of the API into column values.
+
+    :param subject: Subject code or list of codes, or None
+    :param level: Level code or list of codes, or None
+    :param is_paid: 1 (paid), 0 (free) or None
+    :return: Tuple of (subject names or None, level names or None, is_paid or None).
+        Unknown codes are dropped.
+    """
+    if is_paid not in [1, 0, None]:
+        is_paid = None
+
+    # Handle multiple subjects
+    if subject:
+        if not isinstance(subject, list):
+            subject = [subject]
+        subject = [SUBJECT_MAPPING.get(s) for s in subject if s in SUBJECT_MAPPING]
+
+    # Handle multiple levels
+    if level:
+        if not isinstance(level, list):
+            level = [level]
+        level = [LEVEL_MAPPING.get(l) for l in level if l in LEVEL_MAPPING]
+    
+    return subject, level, is_paid
 
 def get_all_courses():
-    return [course.to_dict() for course in Course.query.all()]
+    return [dict(course) for course in get_catalog().course_by_id.values()]
     
-def get_courses(page=1, per_page=10, subject=None, level=None, is_paid=None, order_by='num_subscribers', order_direction='desc', search_query=None):
+def get_courses(page=1, per_page=10, subject=None, level=None, is_paid=None, order_by='num_subscribers', order_direction='desc', search_query=None, cursor=None, include_total=True, fields=None):
     # Subject mapping:
     # 1 -> 'Business Finance'
     # 2 -> 'Graphic Design'
@@ -22,7 +80,14 @@ def get_courses(page=1, per_page=10, subject=None, level=None, is_paid=None, ord
     
     # is_paid may be 1 (paid) or 0 (free)
     
-    # Order by num_subscribers, num_reviews, total_interactions, and total_users
+    # Order by num_subscribers, num_reviews, total_interactions, and total_users,
+    # or by relevance when searching
+    
+    # Pages are picked by page number, or by cursor when cursor is given: '' for the
+    # first page, then the next_cursor of the previous page. include_total=False skips
+    # counting the matching courses, so a cursor page costs a single range query.
+    
+    # fields limits the course keys returned, and the columns loaded from the database.
     
     if page < 1:
         page = 1
@@ -31,38 +96,146 @@ def get_courses(page=1, per_page=10, subject=None, level=None, is_paid=None, ord
     if per_page > 200:
         per_page = 200
         
-    if order_by not in ['num_subscribers', 'num_reviews', 'total_interactions', 'total_users']:
+    if order_by not in ['num_subscribers', 'num_reviews', 'total_interactions', 'total_users', 'relevance']:
+        order_by = 'num_subscribers'
+    if order_by == 'relevance' and not search_query:
         order_by = 'num_subscribers'
     
-    if is_paid not in [1, 0, None]:
-        is_paid = None
-        
-    subject_mapping = {
-        1: 'Business Finance',
-        2: 'Graphic Design',
-        3: 'Web Development',
-        4: 'Musical Instruments'
+    if order_direction != 'desc':
+        order_direction = 'asc'
+    
+    subject, level, is_paid = map_course_filters(subject, level, is_paid)
+    
+    if search_query:
+        return search_course_listing(search_query, page, per_page, subject, level, is_paid, order_by, order_direction, cursor, include_total, fields)
+    
+    if Config.COURSE_LISTING_BACKEND == 'memory':
+        return column_store_course_listing(page, per_page, subject, level, is_paid, order_by, order_direction, cursor, include_total, fields)
+    
+    query = build_course_listing_query(subject, level, is_paid, order_by, order_direction)
+    column = getattr(Course, order_by)
+    if fields is not None:
+        # The sort column and primary key are needed for next_cursor
+        query = query.options(load_only(*{getattr(Course, field) for field in fields}, column, Course.id))
+    
+    if cursor is None:
+        courses = query.paginate(page=page, per_page=per_page, error_out=False, count=include_total)
+        items = courses.items
+        total = courses.total
+        has_next = len(items) == per_page and (total is None or page * per_page < total)
+    else:
+        total = query.order_by(None).count() if include_total else None
+        if cursor:
+            # Keyset condition: strictly after the last course of the previous page.
+            # NULLs sort first, as in MySQL and SQLite.
+            value, last_id = decode_cursor(cursor, order_by, order_direction, *get_sort_key_type(order_by))
+            if value is None and order_direction == 'desc':
+                query = query.filter(column.is_(None), Course.id < last_id)
+            elif value is None:
+                query = query.filter(or_(column.isnot(None), Course.id > last_id))
+            elif order_direction == 'desc':
+                query = query.filter(or_(column < value, column.is_(None), and_(column == value, Course.id < last_id)))
+            else:
+                query = query.filter(or_(column > value, and_(column == value, Course.id > last_id)))
+        # One extra row tells whether there is a next page without counting
+        items = query.limit(per_page + 1).all()
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        page = None
+    
+    next_cursor = None
+    if has_next and items:
+        last = items[-1]
+        next_cursor = encode_cursor(order_by, order_direction, getattr(last, order_by), last.id)
+    
+    return {
+        'courses': [course.to_dict(fields) for course in items],
+        'total': total,
+        'pages': -(-total // per_page) if total is not None else None,
+        'page': page,
+        'per_page': per_page,
+        'next_cursor': next_cursor
     }
 
-    level_mapping = {
-        1: 'Beginner Level',
-        2: 'Intermediate Level',
-        3: 'Expert Level',
-        0: 'All Levels'
+def column_store_course_listing(page, per_page, subject, level, is_paid, order_by, order_direction, cursor=None, include_total=True, fields=None):
+    """
+    List courses from the in-memory column store of the catalog.
+
+    :param page: Page number, starting at 1
+    :param per_page: Courses per page
+    :param subject: List of subject names to keep, or None
+    :param level: List of level names to keep, or None
+    :param is_paid: 1 or 0 to keep paid or free courses, or None
+    :param order_by: The course column to sort on
+    :param order_direction: 'asc' or 'desc'
+    :param cursor: next_cursor of the previous page ('' for the first page) to page
+        by cursor instead of page number, or None
+    :param include_total: Whether to report the total and number of pages
+    :param fields: Course fields to return, or None for all
+    :return: The same page dict as get_courses
+    """
+    store = get_column_store()
+    mask = store.get_mask(subject, level, is_paid)
+    
+    if cursor is None:
+        rows = store.get_ordered_rows(mask, order_by, order_direction)
+        start = (page - 1) * per_page
+        has_next = start + per_page < len(rows)
+    else:
+        after = decode_cursor(cursor, order_by, order_direction, *get_sort_key_type(order_by)) if cursor else None
+        rows = store.get_ordered_rows(mask, order_by, order_direction, after)
+        start = 0
+        has_next = per_page < len(rows)
+        page = None
+    
+    page_rows = rows[start:start + per_page]
+    courses = [store.records[row] for row in page_rows]
+    
+    next_cursor = None
+    if has_next and courses:
+        last = courses[-1]
+        next_cursor = encode_cursor(order_by, order_direction, last[order_by], last['id'])
+    
+    total = int(mask.sum()) if include_total else None
+    return {
+        'courses': project_courses([dict(course) for course in courses], fields),
+        'total': total,
+        'pages': -(-total // per_page) if total is not None else None,
+        'page': page,
+        'per_page': per_page,
+        'next_cursor': next_cursor
     }
 
-    # Handle multiple subjects
-    if subject:
-        if not isinstance(subject, list):
-            subject = [subject]
-        subject = [subject_mapping.get(s) for s in subject if s in subject_mapping]
+def get_sort_key_type(order_by):
+    """
+    Get the type of a listing sort key, to validate cursors against.
 
-    # Handle multiple levels
-    if level:
-        if not isinstance(level, list):
-            level = [level]
-        level = [level_mapping.get(l) for l in level if l in level_mapping]
-    
+    :param order_by: A course column to sort on, or 'relevance'
+    :return: Tuple of (Python type, whether it can be null)
+    """
+    if order_by == 'relevance':
+        return float, False
+    column = Course.__table__.columns[order_by]
+    return column.type.python_type, column.nullable
+
+def _listing_sort_key(value, id):
+    # Orders like the database: NULLs before every value, then by primary key
+    return (value is not None, value if value is not None else 0, id)
+
+def build_course_listing_query(subject, level, is_paid, order_by, order_direction):
+    """
+    Build the filtered and sorted query behind the course listing.
+
+    The composite indexes on the courses table are designed for these queries,
+    see `flask courses check-plans`.
+
+    :param subject: List of subject names to keep, or None
+    :param level: List of level names to keep, or None
+    :param is_paid: 1 or 0 to keep paid or free courses, or None
+    :param order_by: The course column to sort on
+    :param order_direction: 'asc' or 'desc'
+    :return: The query
+    """
     query = Course.query
     if subject:
         query = query.filter(Course.subject.in_(subject))
@@ -70,68 +243,190 @@ def get_courses(page=1, per_page=10, subject=None, level=None, is_paid=None, ord
         query = query.filter(Course.level.in_(level))
     if is_paid is not None:
         query = query.filter_by(is_paid=is_paid)
-    if search_query:
-        query = query.filter(Course.course_title.ilike(f"%{search_query}%"))
-        
-    if order_by == 'num_subscribers':
-        if order_direction == 'desc':
-            query = query.order_by(Course.num_subscribers.desc())
-        else:
-            query = query.order_by(Course.num_subscribers.asc())
-    elif order_by == 'num_reviews':
-        if order_direction == 'desc':
-            query = query.order_by(Course.num_reviews.desc())
-        else:
-            query = query.order_by(Course.num_reviews.asc())
-    elif order_by == 'total_interactions':
-        if order_direction == 'desc':
-            query = query.order_by(Course.total_interactions.desc())
-        else:
-            query = query.order_by(Course.total_interactions.asc())
-    elif order_by == 'total_users':
-        if order_direction == 'desc':
-            query = query.order_by(Course.total_users.desc())
-        else:
-            query = query.order_by(Course.total_users.asc())
-    
-    courses = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    # The primary key breaks ties, so every course has a unique position for cursors
+    column = getattr(Course, order_by)
+    if order_direction == 'desc':
+        query = query.order_by(column.desc(), Course.id.desc())
+    else:
+        query = query.order_by(column.asc(), Course.id.asc())
+    return query
+
+def search_course_listing(search_query, page, per_page, subject, level, is_paid, order_by, order_direction, cursor=None, include_total=True, fields=None):
+    """
+    List the courses matching a title search from the cached catalog and search index.
+
+    :param search_query: The search text
+    :param page: Page number, starting at 1
+    :param per_page: Courses per page
+    :param subject: List of subject names to keep, or None
+    :param level: List of level names to keep, or None
+    :param is_paid: 1 or 0 to keep paid or free courses, or None
+    :param order_by: A course column to sort on, or 'relevance'
+    :param order_direction: 'asc' or 'desc'
+    :param cursor: next_cursor of the previous page ('' for the first page) to page
+        by cursor instead of page number, or None
+    :param include_total: Whether to report the total and number of pages
+    :param fields: Course fields to return, or None for all
+    :return: The same page dict as get_courses
+    """
+    scores = search_courses(search_query)
+    course_by_id = get_catalog().course_by_id
+    
+    courses = [course_by_id[course_id] for course_id in scores]
+    if subject:
+        courses = [course for course in courses if course['subject'] in subject]
+    if level:
+        courses = [course for course in courses if course['level'] in level]
+    if is_paid is not None:
+        courses = [course for course in courses if course['is_paid'] == bool(is_paid)]
+    
+    # Same order as the database listing, NULLs first and ties broken by primary key
+    if order_by == 'relevance':
+        sort_value = lambda course: scores[course['course_id']]
+    else:
+        sort_value = lambda course: course[order_by]
+    sort_key = lambda course: _listing_sort_key(sort_value(course), course['id'])
+    descending = order_direction == 'desc'
+    courses.sort(key=sort_key, reverse=descending)
+    
+    total = len(courses)
+    if cursor is None:
+        start = (page - 1) * per_page
+    else:
+        start = 0
+        if cursor:
+            position = _listing_sort_key(*decode_cursor(cursor, order_by, order_direction, *get_sort_key_type(order_by)))
+            # First course strictly after the last one of the previous page
+            start = next((
+                i for i, course in enumerate(courses)
+                if (sort_key(course) < position if descending else sort_key(course) > position)
+            ), total)
+        page = None
+    
+    items = courses[start:start + per_page]
+    next_cursor = None
+    if items and start + per_page < total:
+        next_cursor = encode_cursor(order_by, order_direction, sort_value(items[-1]), items[-1]['id'])
+    
     return {
-        'courses': [course.to_dict() for course in courses.items],
-        'total': courses.total,
-        'pages': courses.pages,
+        'courses': project_courses([dict(course) for course in items], fields),
+        'total': total if include_total else None,
+        'pages': -(-total // per_page) if include_total else None,
         'page': page,
-        'per_page': per_page
+        'per_page': per_page,
+        'next_cursor': next_cursor
     }
 
-def get_course_by_id(course_id):
-    course = Course.query.filter_by(course_id=course_id).first()
+def get_course_facets(subject=None, level=None, is_paid=None, search_query=None):
+    """
+    Count courses per subject, level and paid/free for a listing's filters.
+
+    Each facet is counted with the other facets' filters applied but not its own,
+    from the precomputed masks of the column store.
+
+    :param subject: Subject code or list of codes, or None
+    :param level: Level code or list of codes, or None
+    :param is_paid: 1 (paid), 0 (free) or None
+    :param search_query: Optional title search the counts are restricted to
+    :return: Dict with the 'total' number of courses matching every filter and the
+        'subject', 'level' and 'is_paid' facets, each a list of {id, name, count}
+    """
+    subject, level, is_paid = map_course_filters(subject, level, is_paid)
+    
+    store = get_column_store()
+    mask = store.get_course_id_mask(search_courses(search_query)) if search_query else None
+    counts, total = store.get_facet_counts(subject, level, is_paid, mask)
+    
+    facets = {'total': total}
+    for facet, mapping, values in [
+        ('subject', SUBJECT_MAPPING, SUBJECT_MAPPING),
+        ('level', LEVEL_MAPPING, LEVEL_MAPPING),
+        ('is_paid', PAID_MAPPING, {1: True, 0: False}),
+    ]:
+        facets[facet] = [
+            {'id': code, 'name': mapping[code], 'count': counts[facet].get(values[code], 0)}
+            for code in mapping
+        ]
+    return facets
+
+def get_course_by_id(course_id, fields=None):
+    course = get_course_record(course_id)
     if course:
-        return course.to_dict()
+        return project_courses([dict(course)], fields)[0]
     else:
         return None
     
-# Get N random courses for each subject that is 'Business Finance', 'Graphics Design', 'Web Development', 'Musical Instruments'.
-def get_random_courses(n=2):
-    subjects = ['Business Finance', 'Graphics Design', 'Web Development', 'Musical Instruments']
-    courses = []
-    for subject in subjects:
-        random_courses = Course.query.filter_by(subject=subject).order_by(db.func.random()).limit(n).all()
-        courses.extend([course.to_dict() for course in random_courses])
-    return courses
+# Get N random courses for each subject that is 'Business Finance', 'Graphic Design', 'Web Development', 'Musical Instruments'.
+def get_random_courses(n=2, seed=None, fields=None):
+    """
+    Draw random courses of every subject from the cached catalog, without querying the database.
+
+    :param n: Courses per subject
+    :param seed: Optional seed to draw the same courses again, e.g. in tests
+    :param fields: Course fields to return, or None for all
+    :return: List of course dicts, grouped by subject
+    """
+    store = get_column_store()
+    rng = np.random.default_rng(seed)
+    rows = store.sample_rows('subject', list(SUBJECT_MAPPING.values()), max(n, 0), rng)
+    return project_courses([dict(store.records[row]) for row in rows], fields)
 
 # Get recommended courses based on the course_id
-def get_recommended_courses_by_course_id(course_id, n):
+def get_recommended_courses_by_course_id(course_id, n, fields=None):
     # Get the singleton instance of ContentBasedModel
     model_instance = ContentBasedModel()
     
-    courses = model_instance.get_recommendations_by_course_id(course_id, n)
+    courses, model_version = get_cached_recommendations(
+        'recommender1', model_instance.artifacts.version, course_id, n,
+        lambda: model_instance.get_recommendations_by_course_id(course_id, n)
+    )
     
-    return courses
+    return project_courses(courses, fields), model_version
 
-def get_recommended_courses_by_user_id(user_id, n):
+# Get recommended courses for several seed course_ids in one batched pass
+def get_recommended_courses_by_course_ids(course_ids, n, fields=None):
+    # Get the singleton instance of ContentBasedModel
+    model_instance = ContentBasedModel()
+    
+    courses, model_version = model_instance.get_recommendations_by_course_ids(course_ids, n)
+    
+    for seed in courses['seeds']:
+        seed['courses'] = project_courses(seed['courses'], fields)
+    courses['merged'] = project_courses(courses['merged'], fields)
+    
+    return courses, model_version
+
+def get_recommended_courses_by_user_id(user_id, n, fields=None):
     # Get the singleton instance of CollaborativeModel
     model_instance = CollaborativeModel()
     
-    courses = model_instance.get_recommendations_by_user_id(user_id, n)
+    courses, model_version = get_cached_recommendations(
+        'recommender2', model_instance.artifacts.version, user_id, n,
+        lambda: model_instance.get_recommendations_by_user_id(user_id, n)
+    )
+    
+    return project_courses(courses, fields), model_version
+
+# Get recommended courses for a registered user, folding in users the collaborative model was not trained on
+def get_recommended_courses_for_user(user, n, fields=None):
+    # Get the singleton instance of CollaborativeModel
+    model_instance = CollaborativeModel()
+    
+    formatted_user_id = f"user_{user['id']}"
+    if user['used_in_collaborative'] and formatted_user_id in model_instance.artifacts.row_by_user_id:
+        courses, model_version = model_instance.get_recommendations_by_user_id(formatted_user_id, n)
+        return project_courses(courses, fields), model_version
+    
+    profile = get_user_profile(user['id'])
+    courses, model_version = model_instance.get_recommendations_by_user_embedding(
+        profile.embedding, n, exclude_course_ids=profile.course_ids, artifacts=profile.artifacts
+    )
+    
+    return project_courses(courses, fields), model_version
+
+# Get recommended courses for a registered user from the content-based and collaborative models combined
+def get_hybrid_recommended_courses_for_user(user, n, content_weight=None, fields=None):
+    courses, model_version = get_hybrid_recommendations(user, n, content_weight)
     
-    return courses
\ No newline at end of file
+    return project_courses(courses, fields), model_version
@@ -0,0 +1,41 @@
+from app.services.course.catalog_cache import get_catalog
+
+def get_courses_by_ids(course_ids):
+    """
+    Look courses up by course_id in the cached catalog.
+
+    :param course_ids: Course IDs (int or numeric str)
+    :return: Dict of course_id (int) to course dict, for the courses that exist
+    """
+    catalog = get_catalog().course_by_id
+
+    course_by_id = {}
+    for course_id in course_ids:
+        course = catalog.get(int(course_id))
+        if course is not None:
+            course_by_id[course['course_id']] = dict(course)
+    return course_by_id
+
+def hydrate_courses(course_ids, scores=None, course_by_id=None):
+    """
+    Turn ranked course IDs into course dicts, keeping the rank order.
+
+    :param course_ids: Course IDs (int or numeric str) in rank order
+    :param scores: Optional model score of each course, in the same order
+    :param course_by_id: Optional courses already fetched with get_courses_by_ids,
+        e.g. to hydrate several lists with one lookup. Fetched when omitted.
+    :return: List of course dicts in the order of course_ids, with a 'score'
+        key when scores are given. Courses missing from the database are skipped.
+    """
+    if course_by_id is None:
+        course_by_id = get_courses_by_ids(course_ids)
+
+    courses = []
+    for position, course_id in enumerate(course_ids):
+        course = course_by_id.get(int(course_id))
+        if course is None:
+            continue
+        if scores is not None:
+            course = {**course, 'score': float(scores[position])}
+        courses.append(course)
+    return courses
@@ -0,0 +1,56 @@
+import base64
+import json
+import math
+
+class InvalidCursorError(ValueError):
+    """
+    A listing cursor that is malformed or was made for another sort order.
+    """
+
+def encode_cursor(order_by, order_direction, value, id):
+    """
+    Build the opaque cursor pointing after a course in a listing.
+
+    :param order_by: The sort key of the listing
+    :param order_direction: 'asc' or 'desc'
+    :param value: The sort key value of the last course returned
+    :param id: The primary key of the last course returned, which breaks ties
+    :return: URL-safe cursor string
+    """
+    payload = json.dumps([order_by, order_direction, value, id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def _is_int(value):
+    # bool is an int subclass, but JSON true/false is never a valid key
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+def decode_cursor(cursor, order_by, order_direction, value_type=int, nullable=False):
+    """
+    Read a cursor made by encode_cursor.
+
+    :param cursor: The cursor string
+    :param order_by: The sort key of the current listing
+    :param order_direction: 'asc' or 'desc'
+    :param value_type: Python type of the sort key, int or float
+    :param nullable: Whether the sort key can be null
+    :return: Tuple of (sort key value, id) of the last course returned
+    :raises InvalidCursorError: If the cursor is malformed or was made for another sort order
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_order_by, cursor_direction, value, id = json.loads(payload)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if cursor_order_by != order_by or cursor_direction != order_direction:
+        raise InvalidCursorError("Cursor does not match the requested order")
+
+    if value is None:
+        valid_value = nullable
+    elif value_type is float:
+        valid_value = _is_int(value) or (isinstance(value, float) and math.isfinite(value))
+    else:
+        valid_value = _is_int(value)
+    if not valid_value or not _is_int(id):
+        raise InvalidCursorError("Invalid cursor")
+    return value, id
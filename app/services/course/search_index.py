@@ -0,0 +1,117 @@
+import bisect
+import math
+import re
+from threading import Lock
+
+import numpy as np
+
+from app.services.course.catalog_cache import get_catalog
+
+# BM25 term frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens.
+
+    :param text: The text to tokenize
+    :return: List of tokens
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+class SearchIndex:
+    """
+    Inverted index with BM25 weights over the course titles of one catalog snapshot.
+
+    Every posting stores its precomputed BM25 weight, so a query only gathers
+    and adds arrays. Query terms match every indexed term they are a prefix of,
+    so partial words typed in a search box already find courses.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.course_ids = np.array(list(catalog.course_by_id), dtype=np.int64)
+
+        postings = {}
+        lengths = np.zeros(len(self.course_ids), dtype=np.float32)
+        for doc, course in enumerate(catalog.course_by_id.values()):
+            tokens = tokenize(course['course_title'])
+            lengths[doc] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc] = counts.get(doc, 0) + 1
+
+        n_docs = len(self.course_ids)
+        avg_length = lengths.mean() if n_docs else 0.0
+        self.terms = sorted(postings)
+        self.postings = {}
+        for term in self.terms:
+            docs = np.fromiter(postings[term].keys(), dtype=np.int64)
+            tf = np.fromiter(postings[term].values(), dtype=np.float32)
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avg_length)
+            self.postings[term] = (docs, idf * tf * (BM25_K1 + 1) / (tf + norm))
+
+    def _expand(self, token):
+        # Indexed terms starting with token, found by binary search in the sorted vocabulary
+        start = bisect.bisect_left(self.terms, token)
+        end = bisect.bisect_left(self.terms, token + "\U0010ffff", start)
+        return self.terms[start:end]
+
+    def search(self, query):
+        """
+        Find the courses whose title matches every term of a query.
+
+        :param query: The search text
+        :return: Dict of course_id to BM25 score of the matching courses
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return {}
+
+        scores = np.zeros(len(self.course_ids), dtype=np.float32)
+        matched = np.ones(len(self.course_ids), dtype=bool)
+        for token in tokens:
+            # A course scores the best of the terms a query term expands to
+            token_scores = np.zeros(len(self.course_ids), dtype=np.float32)
+            for term in self._expand(token):
+                docs, weights = self.postings[term]
+                token_scores[docs] = np.maximum(token_scores[docs], weights)
+            matched &= token_scores > 0
+            scores += token_scores
+
+        docs = np.flatnonzero(matched)
+        return dict(zip(self.course_ids[docs].tolist(), scores[docs].tolist()))
+
+_index = None
+_index_lock = Lock()
+
+def get_search_index():
+    """
+    Get the search index of the current catalog, rebuilding it when the catalog changed.
+
+    :return: The SearchIndex
+    """
+    global _index
+
+    catalog = get_catalog()
+    index = _index
+    if index is None or index.catalog is not catalog:
+        with _index_lock:
+            index = _index
+            if index is None or index.catalog is not catalog:
+                index = SearchIndex(catalog)
+                _index = index
+    return index
+
+def search_courses(query):
+    """
+    Search course titles.
+
+    :param query: The search text
+    :return: Dict of course_id to relevance score of the matching courses
+    """
+    return get_search_index().search(query)
@@ -0,0 +1,225 @@
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.services.recommender.artifacts import export_lock, save_array
+from app.services.recommender.top_k import top_k
+
+class BruteForceIndex:
+    """
+    Exact maximum inner product search that scores every candidate.
+    """
+    kind = "brute_force"
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def search(self, queries, k):
+        """
+        Find the k highest-scoring candidates for each query.
+
+        Args:
+            queries (np.ndarray): Query embeddings of shape (n_queries, embedding_dim).
+            k (int): The number of results per query.
+
+        Returns:
+            Tuple of (scores, rows), both of shape (n_queries, k) and sorted by
+            descending score.
+        """
+        return top_k(np.asarray(queries) @ self.embeddings.T, k)
+
+class IVFFlatIndex:
+    """
+    Approximate inner product search over an inverted-file (IVF) index.
+
+    Candidates are clustered with k-means. A query scores the cluster centroids
+    first, then scores exactly only the candidates in its `n_probe` best lists.
+    """
+    kind = "ivf_flat"
+
+    def __init__(self, embeddings, centroids, list_offsets, list_rows, n_probe):
+        """
+        Args:
+            embeddings (np.ndarray): Candidate embeddings of shape (n, embedding_dim).
+            centroids (np.ndarray): Cluster centroids of shape (n_lists, embedding_dim).
+            list_offsets (np.ndarray): Start of each list in `list_rows`, of length n_lists + 1.
+            list_rows (np.ndarray): Candidate rows grouped by list.
+            n_probe (int): The number of lists scored per query.
+        """
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.n_probe = max(1, min(n_probe, len(centroids)))
+
+    @staticmethod
+    def train(embeddings, n_lists, n_iter=20, seed=0):
+        """
+        Cluster the candidates into inverted lists with k-means.
+
+        Args:
+            embeddings (np.ndarray): Candidate embeddings of shape (n, embedding_dim).
+            n_lists (int): The number of clusters.
+            n_iter (int): The number of Lloyd iterations.
+            seed (int): Seed for the centroid initialisation.
+
+        Returns:
+            Tuple of (centroids, list_offsets, list_rows).
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n_lists = max(1, min(n_lists, len(embeddings)))
+        rng = np.random.default_rng(seed)
+        centroids = embeddings[rng.choice(len(embeddings), n_lists, replace=False)].copy()
+        squared_norms = (embeddings ** 2).sum(axis=1)
+
+        for _ in range(n_iter):
+            distances = squared_norms[:, None] - 2 * embeddings @ centroids.T + (centroids ** 2).sum(axis=1)
+            assignments = distances.argmin(axis=1)
+            counts = np.bincount(assignments, minlength=n_lists)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, embeddings)
+            non_empty = counts > 0
+            centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+            # Re-seed empty lists with random candidates
+            empty = np.flatnonzero(~non_empty)
+            if len(empty):
+                centroids[empty] = embeddings[rng.choice(len(embeddings), len(empty), replace=False)]
+
+        list_rows = np.argsort(assignments, kind="stable").astype(np.int32)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]).astype(np.int32)
+        return centroids, list_offsets, list_rows
+
+    def search(self, queries, k):
+        """
+        Find approximately the k highest-scoring candidates for each query.
+
+        If the probed lists hold fewer than k candidates, further lists are
+        probed in centroid order until there are enough.
+
+        Args:
+            queries (np.ndarray): Query embeddings of shape (n_queries, embedding_dim).
+            k (int): The number of results per query.
+
+        Returns:
+            Tuple of (scores, rows), both of shape (n_queries, k) and sorted by
+            descending score.
+        """
+        queries = np.asarray(queries)
+        k = min(k, len(self.embeddings))
+        list_order = np.argsort(-(queries @ self.centroids.T), axis=1)
+        list_sizes = np.diff(self.list_offsets)
+
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        rows = np.empty((len(queries), k), dtype=np.intp)
+        for i, (query, lists) in enumerate(zip(queries, list_order)):
+            n_probe = max(self.n_probe, int(np.searchsorted(np.cumsum(list_sizes[lists]), k)) + 1)
+            candidates = np.concatenate([
+                self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists[:n_probe]
+            ])
+            scores[i], best = top_k(self.embeddings[candidates] @ query, k)
+            rows[i] = candidates[best]
+
+        return scores, rows
+
+def search_batch(queries):
+    """
+    Search a batch of (artifacts, query_embedding, n) queries with one index
+    search per model version. Used as the `run_batch` of both recommenders'
+    MicroBatcher.
+
+    Args:
+        queries (list): The queries. `artifacts` is any model snapshot with an
+            `index`, e.g. ContentBasedArtifacts or CollaborativeArtifacts.
+
+    Returns:
+        List of candidate row arrays, the top n of each query in score order.
+    """
+    results = [None] * len(queries)
+
+    # Queries only straddle two versions right after a reload
+    by_version = {}
+    for i, (artifacts, _, _) in enumerate(queries):
+        by_version.setdefault(id(artifacts), (artifacts, []))[1].append(i)
+
+    for artifacts, positions in by_version.values():
+        query_embeddings = np.stack([queries[i][1] for i in positions])
+        _, rows = artifacts.index.search(query_embeddings, max(queries[i][2] for i in positions))
+        for query_rows, i in zip(rows, positions):
+            results[i] = query_rows[:queries[i][2]]
+
+    return results
+
+def load_or_build_index(embeddings, export_dir, kind=None):
+    """
+    Build the configured index over a candidate matrix.
+
+    Trained index structures are exported next to the other serving arrays of
+    the model version, so they are only computed once per version.
+
+    Args:
+        embeddings (np.ndarray): Candidate embeddings of shape (n, embedding_dim).
+        export_dir (Path): The export directory of the model version.
+        kind (str): 'brute_force' or 'ivf_flat'. Defaults to `Config.RECOMMENDER_INDEX`.
+
+    Returns:
+        A BruteForceIndex or IVFFlatIndex.
+    """
+    kind = kind or Config.RECOMMENDER_INDEX
+
+    if kind == BruteForceIndex.kind:
+        return BruteForceIndex(embeddings)
+
+    if kind == IVFFlatIndex.kind:
+        n_lists = Config.IVF_N_LISTS or int(np.sqrt(len(embeddings)))
+        paths = [export_dir / f"ivf_{n_lists}_{name}.npy" for name in ("centroids", "list_offsets", "list_rows")]
+        if not all(path.exists() for path in paths):
+            with export_lock(export_dir):
+                if not all(path.exists() for path in paths):
+                    for path, array in zip(paths, IVFFlatIndex.train(embeddings, n_lists)):
+                        save_array(path, array)
+
+        centroids, list_offsets, list_rows = (np.load(path, mmap_mode="r") for path in paths)
+        return IVFFlatIndex(embeddings, centroids, list_offsets, list_rows, Config.IVF_N_PROBE)
+
+    raise ValueError(f"Unknown recommender index '{kind}'. Use 'brute_force' or 'ivf_flat'.")
+
+def evaluate_index(index, exact_index, queries, k):
+    """
+    Measure recall and latency of an index against exact search.
+
+    Args:
+        index: The index to evaluate.
+        exact_index (BruteForceIndex): The exact reference index.
+        queries (np.ndarray): Query embeddings of shape (n_queries, embedding_dim).
+        k (int): The number of results per query.
+
+    Returns:
+        Dict with 'recall' (mean recall@k), and the mean and p99 per-query
+        latency in milliseconds of both indexes.
+    """
+    def timed_search(search_index):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, rows = search_index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(rows[0])
+        return np.array(latencies), results
+
+    latencies, results = timed_search(index)
+    exact_latencies, exact_results = timed_search(exact_index)
+    recall = np.mean([
+        len(np.intersect1d(rows, exact_rows)) / len(exact_rows)
+        for rows, exact_rows in zip(results, exact_results)
+    ])
+
+    return {
+        'recall': float(recall),
+        'latency_ms': float(latencies.mean()),
+        'p99_latency_ms': float(np.percentile(latencies, 99)),
+        'exact_latency_ms': float(exact_latencies.mean()),
+        'exact_p99_latency_ms': float(np.percentile(exact_latencies, 99)),
+    }
@@ -0,0 +1,130 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from app.config import Config
+
+def get_model_version(*paths):
+    """
+    Compute a version string for a set of model artifacts.
+    
+    The version is a content hash, so it changes whenever a retrained model
+    is dropped in place and stays stable across restarts and workers.
+    
+    Args:
+        *paths (Path): Artifact files or directories the model is built from.
+    
+    Returns:
+        str: A short hexadecimal version string.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        path = Path(path)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            digest.update(file.relative_to(path.parent).as_posix().encode("utf-8"))
+            with open(file, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def get_export_dir(model_name, version):
+    """
+    Get the directory holding the derived serving arrays of a model version.
+    
+    Args:
+        model_name (str): The model name, e.g. 'content_based'.
+        version (str): The model version from `get_model_version`.
+    
+    Returns:
+        Path: The export directory. It is created if it does not exist.
+    """
+    export_dir = Path(Config.RECOMMENDER_EXPORT_DIR) / model_name / version
+    export_dir.mkdir(parents=True, exist_ok=True)
+    return export_dir
+
+# Exported files are readable by every user, so workers running as another
+# user than the build commands can still memory-map them
+EXPORT_FILE_MODE = 0o644
+
+def _replace(tmp_path, path):
+    # mkstemp creates files readable by their owner only
+    os.chmod(tmp_path, EXPORT_FILE_MODE)
+    os.replace(tmp_path, path)
+
+def save_array(path, array):
+    """
+    Atomically write an array to a .npy file.
+    
+    The array is written to a temporary file next to `path` and renamed into
+    place, so readers never observe a partially written file.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_arrays(path, arrays):
+    """
+    Atomically write a dict of named arrays to a .npz file.
+    
+    Like `save_array`, the file is written next to `path` and renamed into place.
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def export_lock(export_dir):
+    """
+    Hold an exclusive lock on an export directory.
+    
+    Worker processes starting together share the export directory, so builds
+    are serialised and each artifact is only computed by the first of them.
+    """
+    with open(Path(export_dir) / ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def load_or_build_array(path, build):
+    """
+    Attach to an exported array, building and saving it first if it is missing.
+    
+    The array is always returned memory-mapped read-only, so every worker
+    process attached to the same file shares one copy in the page cache.
+    
+    Args:
+        path (Path): The .npy file of the array.
+        build (callable): Returns the array when it has not been exported yet.
+    
+    Returns:
+        np.ndarray: The read-only memory-mapped array.
+    """
+    path = Path(path)
+    if not path.exists():
+        with export_lock(path.parent):
+            if not path.exists():
+                save_array(path, build())
+    
+    return np.load(path, mmap_mode="r")
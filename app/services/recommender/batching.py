@@ -0,0 +1,115 @@
+import os
+import queue
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+
+class ProcessLocalThread:
+    """
+    A background daemon thread started at most once per process.
+
+    Threads do not survive a fork, so every forked worker starts its own
+    thread on first use instead of relying on one started before the fork.
+    """
+
+    def __init__(self, target, name, setup=None):
+        """
+        Args:
+            target (callable): The thread body.
+            name (str): Name of the thread.
+            setup (callable): Optional, called before the thread of a process
+                starts, e.g. to replace state inherited from the parent.
+        """
+        self._target = target
+        self._name = name
+        self._setup = setup
+        self._lock = Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        """
+        Start the thread of this process if it is not running yet.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._setup is not None:
+                    self._setup()
+                Thread(target=self._target, name=self._name, daemon=True).start()
+                self._pid = os.getpid()
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single queries into batched model calls.
+
+    Queries submitted from request threads are collected by a background
+    thread until either the batching window elapses or the batch is full.
+    They are then scored with one call to `run_batch`, and each result is
+    handed back to the thread that submitted it.
+
+    A window of 0 disables batching and runs every query inline.
+    """
+
+    def __init__(self, run_batch, window_ms=0, max_batch_size=32, name="micro-batcher"):
+        """
+        Args:
+            run_batch (callable): Takes a list of queries and returns a list of
+                results in the same order.
+            window_ms (float): How long to wait for more queries after the first
+                one of a batch arrives, in milliseconds.
+            max_batch_size (int): Dispatch as soon as this many queries are waiting.
+            name (str): Name of the background thread.
+        """
+        self._run_batch = run_batch
+        self._window = window_ms / 1000
+        self._max_batch_size = max(1, max_batch_size)
+
+        self._queue = queue.Queue()
+        self._worker = ProcessLocalThread(self._work, name, setup=self._reset_queue)
+
+    def submit(self, query):
+        """
+        Score a single query, batched with any concurrent ones.
+
+        Args:
+            query: One query in the format `run_batch` expects.
+
+        Returns:
+            The result of the query. Exceptions raised by `run_batch` are re-raised.
+        """
+        if self._window <= 0:
+            return self._run_batch([query])[0]
+
+        self._worker.ensure_started()
+        future = Future()
+        self._queue.put((query, future))
+        return future.result()
+
+    def _reset_queue(self):
+        # The parent's queries are not this process's to answer
+        self._queue = queue.Queue()
+
+    def _work(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self._run_batch([query for query, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
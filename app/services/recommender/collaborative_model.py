@@ -1,198 +1,344 @@
 from threading import Lock
 from pathlib import Path
-import tensorflow as tf
-import os
-from app.models.course import Course
-from app.extensions import db
-import pandas as pd
-import tensorflow_recommenders as tfrs
-from tensorflow import keras
+from app.config import Config
+from app.services.course.catalog_cache import get_catalog
+from app.services.course.hydrate import hydrate_courses
+from app.services.recommender.ann_index import load_or_build_index, search_batch
+from app.services.recommender.artifacts import get_export_dir, load_or_build_array, save_array
+from app.services.recommender.batching import MicroBatcher
+from app.services.recommender.reloading import HotSwappableModel
+import numpy as np
 import pickle
 
-# os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-# os.environ['TF_USE_LEGACY_KERAS'] = '1'
-
-# ⬇️ Inherit dari TFRS (TensorFlow Recommenders)
-class CourseModel(tfrs.Model):
-    def __init__(self, user_vocab, course_vocab, embedding_dim=64):
-        super().__init__()
-
-        # ================================
-        # Simpan parameter sebagai atribut
-        # Penting untuk get_config agar bisa serialisasi dengan benar
-        # ================================
-        self.user_vocab = user_vocab
-        self.course_vocab = course_vocab
-        self.embedding_dim = embedding_dim
-
-        # Tambahkan metrik total_loss eksplisit
-        self.total_loss_tracker = tf.keras.metrics.Mean(name="total_loss")
-
-        # ================================
-        # 🏛 USER TOWER
-        # Ubah user_id (string) ➜ index ➜ embedding
-        # ================================
-        self.user_model = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(
-                vocabulary=user_vocab,   # daftar semua user_id
-                mask_token=None          # tidak pakai token khusus untuk "kosong"
-            ),
-            tf.keras.layers.Embedding(
-                input_dim=len(user_vocab) + 1,
-                output_dim=embedding_dim
-            )
-        ])
-
-        # ================================
-        # 🏫 COURSE TOWER
-        # Ubah course_id (string) ➜ index ➜ embedding
-        # ================================
-        self.course_model = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(
-                vocabulary=course_vocab,
-                mask_token=None
-            ),
-            tf.keras.layers.Embedding(
-                input_dim=len(course_vocab) + 1,
-                output_dim=embedding_dim
-            )
-        ])
-
-        # =======================================
-        # 🎯 RETRIEVAL TASK (dengan evaluasi Top-K)
-        # Tujuannya adalah: buat user dan course relevan
-        # saling mendekat di ruang embedding
-        # =======================================
-        self.task = tfrs.tasks.Retrieval(
-            metrics=tfrs.metrics.FactorizedTopK(
-                candidates=tf.data.Dataset.from_tensor_slices(course_vocab)
-                    .batch(128)
-                    .map(self.course_model)  # konversi course_id ➜ embedding
-            )
-        )
-
-    # ============================================
-    # 🚀 call
-    # Definisi forward pass model
-    # Input: fitur berisi 'user_id' dan 'course_id'
-    # Output: embedding vektor untuk user dan course
-    # Dipakai saat inference dan saat menyimpan model
-    # ============================================
-    def call(self, features):
-        user_embeddings = self.user_model(features['user_id'])
-        course_embeddings = self.course_model(features['course_id'])
-        return user_embeddings, course_embeddings
-
-    # ============================================
-    # ⚙️ get_config
-    # Mengembalikan konfigurasi model dalam bentuk dictionary
-    # Konfigurasi ini berisi parameter penting untuk membangun ulang model
-    # Berguna untuk menyimpan dan memuat model subclass dengan benar
-    # ============================================
-    def get_config(self):
-        return {
-            'user_vocab': self.user_vocab,
-            'course_vocab': self.course_vocab,
-            'embedding_dim': self.embedding_dim
-        }
-
-    # ============================================
-    # 🏗️ from_config (classmethod)
-    # Membuat instance model baru dari konfigurasi yang disimpan
-    # Memungkinkan reconstruct model dengan parameter yang sama saat loading
-    # ============================================
-    @classmethod
-    def from_config(cls, config):
-        return cls(**config)
-
-    # ============================================
-    # 🔁 compute_loss
-    # Fungsi utama saat training untuk menghitung loss
-    # input = features['user_id'] dan ['course_id']
-    # output = loss dari user-course pairs
-    # ============================================
-    def compute_loss(self, features, training=False):
-        user_embeddings = self.user_model(features['user_id'])
-        course_embeddings = self.course_model(features['course_id'])
-        loss = self.task(user_embeddings, course_embeddings)
-        self.total_loss_tracker.update_state(loss)
-        return loss
-
-    # ============================================
-    # 📊 metrics
-    # properti agar total_loss dikenali sebagai metrik oleh callback dan bisa di-iterasi oleh Keras
-    # ============================================
-    @property # Tambahkan dekorator ini!
-    def metrics(self):
-        # Pastikan ini mengembalikan daftar objek metrik
-        # Termasuk metrik dari TFRS task jika kamu ingin juga dimonitor secara langsung oleh Keras
-        return [self.total_loss_tracker] + self.task.metrics # self.task.metrics sudah list
+class CollaborativeArtifacts:
+    """
+    The serving arrays of one collaborative model version.
+    
+    A snapshot is never modified once built, so a request that holds on to it
+    keeps a consistent view while a newer version is swapped in.
+    """
+    
+    def __init__(self, version, user_ids, user_embeddings, candidate_ids, candidate_embeddings, index, user_top=None):
+        self.version = version
+        self.user_ids = user_ids
+        self.user_embeddings = user_embeddings
+        self.candidate_ids = candidate_ids
+        self.candidate_embeddings = candidate_embeddings
+        self.index = index
+        
+        # Precomputed top candidate rows per user table row, None until the batch job ran
+        self.user_top = user_top
+        
+        # Row 0 of the user table is StringLookup's out-of-vocabulary embedding
+        self.row_by_user_id = {str(user_id): row for row, user_id in enumerate(user_ids, start=1)}
+        self.row_by_course_id = {str(course_id): row for row, course_id in enumerate(candidate_ids)}
 
-class CollaborativeModel:
+class CollaborativeModel(HotSwappableModel):
     """
     A class to represent a colaborative recommendation model.
     """
     _instance = None
     _lock = Lock()
+    _model_lock = Lock()
+    _reload_lock = Lock()
+    
+    model = None
+    model_dir = None
+    batcher = None
+    
+    # (model version, catalog version, embedding) of the last popularity prior
+    prior = None
     
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             with cls._lock:
                 if not cls._instance:
-                    cls._instance = super().__new__(cls)
+                    instance = super().__new__(cls)
                     
                     # Initialize the model
-                    cls._instance._load_model()
+                    instance._load_model()
+                    cls._instance = instance
         return cls._instance
     
     def _load_model(self):
         """
-        Load the content-based recommendation model.
-        This is a placeholder for the actual model loading logic.
+        Load the colaborative recommendation model.
+        
+        Both towers are exported once per model version as plain embedding
+        tables and memory-mapped, so serving is a NumPy lookup and matrix
+        product. TensorFlow is only loaded when a table still has to be built.
         """
         
         # Dynamically construct the path to the saved model directory
         model_dir = Path(__file__).parent.parent.parent.parent / "ml_model" / "collaborative"
         if model_dir.exists():
-            with open(model_dir / "course_ids.pkl", "rb") as f:
-                loaded_course_ids = pickle.load(f)
-            with open(model_dir / "user_ids.pkl", "rb") as f:
-                loaded_user_ids = pickle.load(f)
-                
-            loaded_model = CourseModel(
-                user_vocab=loaded_user_ids,
-                course_vocab=loaded_course_ids,
-                embedding_dim=128  # sesuaikan dengan setting waktu training
-            )
-            
-            # Compile model sesuai konfigurasi optimizer awal
-            loaded_model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
-            
-            # Load the model weights
-            loaded_model.load_weights(model_dir / "model_weights" / "model_weights")
-            
-            loaded_index = tf.saved_model.load(
-                str(model_dir / "saved_cf_index")
-            )
+            self.model_dir = model_dir
             
-            # Try 2
-            index = tfrs.layers.factorized_top_k.BruteForce(loaded_model.user_model)
-            index.index_from_dataset(
-                tf.data.Dataset.from_tensor_slices(loaded_course_ids).batch(128).map(lambda cid: (cid, loaded_model.course_model(cid)))
+            # Coalesce concurrent queries into one batched index search
+            self.batcher = MicroBatcher(
+                search_batch,
+                window_ms=Config.RECOMMENDER_BATCH_WINDOW_MS,
+                max_batch_size=Config.RECOMMENDER_MAX_BATCH_SIZE,
+                name="collaborative-batcher"
             )
             
-            self.model = index
+            self.reload()
 
         else:
             raise FileNotFoundError(f"Model directory {model_dir} does not exist. Please ensure the model is saved correctly.")
+    
+    def _get_artifact_paths(self):
+        return [
+            self.model_dir / "model_weights",
+            self.model_dir / "course_ids.pkl",
+            self.model_dir / "user_ids.pkl",
+        ]
+    
+    def _load_artifacts(self, version):
+        """
+        Attach to the exported serving arrays of a model version, building any
+        that are missing.
+        """
+        export_dir = get_export_dir("collaborative", version)
+        
+        # The Keras network of the previous version must not be reused for builds
+        with self._model_lock:
+            self.model = None
+        
+        # Both tables are row-aligned with the StringLookup vocabularies
+        user_ids = load_or_build_array(export_dir / "user_ids.npy", lambda: self._load_ids("user_ids.pkl"))
+        user_embeddings = load_or_build_array(
+            export_dir / "user_embeddings.npy",
+            lambda: self._export_embedding_table(self.get_model().user_model, user_ids)
+        )
+        candidate_ids = load_or_build_array(export_dir / "candidate_ids.npy", lambda: self._load_ids("course_ids.pkl"))
+        candidate_embeddings = load_or_build_array(
+            export_dir / "candidate_embeddings.npy",
+            lambda: self._export_embedding_table(self.get_model().course_model, candidate_ids)[1:]
+        )
+        
+        return CollaborativeArtifacts(
+            version=version,
+            user_ids=user_ids,
+            user_embeddings=user_embeddings,
+            candidate_ids=candidate_ids,
+            candidate_embeddings=candidate_embeddings,
+            index=load_or_build_index(candidate_embeddings, export_dir),
+            user_top=self._load_user_top(version)
+        )
+    
+    def reload(self):
+        """
+        Swap in the model files on disk if they changed since the last load,
+        or attach the precomputed user table once the batch job has written it.
+        
+        Returns:
+            bool: Whether a new model version was swapped in.
+        """
+        swapped = super().reload()
+        artifacts = self.artifacts
+        if not swapped and artifacts.user_top is None:
+            user_top = self._load_user_top(artifacts.version)
+            if user_top is not None:
+                self._replace_artifacts(artifacts, user_top=user_top)
+        return swapped
+    
+    def _get_user_top_path(self, version):
+        return get_export_dir("collaborative", version) / f"user_top_{Config.USER_TOP_N_SIZE}.npy"
+    
+    def _load_user_top(self, version):
+        user_top_path = self._get_user_top_path(version)
+        return np.load(user_top_path, mmap_mode="r") if user_top_path.exists() else None
+    
+    def precompute_user_top(self, block_size=4096):
+        """
+        Score every user of the current model version against all candidates
+        and export the top USER_TOP_N_SIZE candidate rows of each.
+        
+        Users are scored in blocks of `block_size`, one matrix product each.
+        The table is row-aligned with the user embedding table, including the
+        out-of-vocabulary row used for unknown users.
+        
+        Returns:
+            The (n_users + 1, USER_TOP_N_SIZE) int32 table.
+        """
+        artifacts = self.artifacts
+        user_embeddings = artifacts.user_embeddings
+        k = min(Config.USER_TOP_N_SIZE, len(artifacts.candidate_ids))
+        
+        user_top = np.empty((len(user_embeddings), k), dtype=np.int32)
+        for start in range(0, len(user_embeddings), block_size):
+            _, rows = artifacts.index.search(user_embeddings[start:start + block_size], k)
+            user_top[start:start + len(rows)] = rows
+        
+        user_top_path = self._get_user_top_path(artifacts.version)
+        save_array(user_top_path, user_top)
+        self._replace_artifacts(artifacts, user_top=np.load(user_top_path, mmap_mode="r"))
+        return user_top
+    
+    def _load_ids(self, file_name):
+        with open(self.model_dir / file_name, "rb") as f:
+            return np.asarray(pickle.load(f))
+    
+    def _load_network(self):
+        """
+        Build the TFRS network and restore its trained weights.
+        """
+        model_dir = self.model_dir
+        with open(model_dir / "course_ids.pkl", "rb") as f:
+            loaded_course_ids = pickle.load(f)
+        with open(model_dir / "user_ids.pkl", "rb") as f:
+            loaded_user_ids = pickle.load(f)
+            
+        # TensorFlow is only imported once a process actually needs the network
+        import tensorflow as tf
+        from app.services.recommender.collaborative_network import CourseModel
+        
+        loaded_model = CourseModel(
+            user_vocab=loaded_user_ids,
+            course_vocab=loaded_course_ids,
+            embedding_dim=128  # sesuaikan dengan setting waktu training
+        )
+        
+        # Compile model sesuai konfigurasi optimizer awal
+        loaded_model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
+        
+        # Load the model weights
+        loaded_model.load_weights(model_dir / "model_weights" / "model_weights")
+        
+        return loaded_model
+    
+    @staticmethod
+    def _export_embedding_table(tower, ids):
+        """
+        Export the embedding table of a StringLookup -> Embedding tower.
+        
+        Returns:
+            The (len(ids) + 1, embedding_dim) float32 table. Row 0 is the
+            out-of-vocabulary embedding and row i + 1 the embedding of ids[i].
+        """
+        import tensorflow as tf
+        
+        # Looking the vocabulary up through the tower keeps the exact StringLookup
+        # mapping, and builds the layers if they were not called yet
+        return np.ascontiguousarray(
+            tower(tf.constant(np.concatenate([["[UNK]"], ids.astype(str)]))).numpy(),
+            dtype=np.float32
+        )
+    
+    def get_user_embeddings(self, user_ids, artifacts=None):
+        """
+        Look users up in the exported user embedding table.
+        
+        Args:
+            user_ids (list[str]): The user IDs to embed, e.g. 'user_1'.
+            artifacts (CollaborativeArtifacts): The model version to use.
+                Defaults to the current one.
+        
+        Returns:
+            The (n_users, embedding_dim) float32 user embeddings. Unknown users
+            get the out-of-vocabulary embedding.
+        """
+        artifacts = artifacts or self.artifacts
+        return artifacts.user_embeddings[[artifacts.row_by_user_id.get(user_id, 0) for user_id in user_ids]]
+    
+    def get_top_course_ids(self, user_ids, n, artifacts=None):
+        """
+        Score many users against every candidate at once.
+        
+        All users are scored with a single matrix product, so this is the
+        entry point for bulk jobs as well as for batched live queries.
+        
+        Args:
+            user_ids (list[str]): The user IDs to score, e.g. 'user_1'.
+            n (int): The number of courses per user.
+            artifacts (CollaborativeArtifacts): The model version to use.
+                Defaults to the current one.
+        
+        Returns:
+            Tuple of (scores, course_ids), both of shape (n_users, n) and
+            sorted by descending score.
+        """
+        artifacts = artifacts or self.artifacts
+        scores, rows = artifacts.index.search(self.get_user_embeddings(user_ids, artifacts), n)
+        return scores, artifacts.candidate_ids[rows]
+    
+    def fold_in_user(self, course_ids, weights, artifacts=None):
+        """
+        Compute an embedding for a user outside the trained vocabulary from
+        the courses they interacted with.
+        
+        The user is placed at the weighted mean of the course tower embeddings
+        of those courses, so no retraining is needed.
+        
+        Args:
+            course_ids (list[int]): The courses the user interacted with.
+            weights (list[float]): The weight of each interaction.
+            artifacts (CollaborativeArtifacts): The model version to use.
+                Defaults to the current one.
+        
+        Returns:
+            The (embedding_dim,) float32 user embedding, or None if none of the
+            courses is in the model.
+        """
+        artifacts = artifacts or self.artifacts
+        rows, row_weights = [], []
+        for course_id, weight in zip(course_ids, weights):
+            row = artifacts.row_by_course_id.get(str(course_id))
+            if row is not None:
+                rows.append(row)
+                row_weights.append(weight)
+        
+        if not rows:
+            return None
         
+        return np.average(artifacts.candidate_embeddings[rows], axis=0, weights=row_weights).astype(np.float32)
+    
+    def get_prior_embedding(self, artifacts=None):
+        """
+        Get the embedding of a user with no interactions yet.
+        
+        The whole catalog is folded in, each course weighted by its total
+        interactions plus one, so such users get the courses most in line with
+        what is popular overall. The out-of-vocabulary row would instead give
+        every one of them the same arbitrary list. The prior is cached
+        per model version and catalog version.
+        
+        Args:
+            artifacts (CollaborativeArtifacts): The model version to use.
+                Defaults to the current one.
+        
+        Returns:
+            The (embedding_dim,) float32 user embedding.
+        """
+        artifacts = artifacts or self.artifacts
+        catalog = get_catalog()
+        prior = self.prior
+        if prior is None or prior[:2] != (artifacts.version, catalog.version):
+            courses = catalog.course_by_id.values()
+            embedding = self.fold_in_user(
+                [course['course_id'] for course in courses],
+                [(course['total_interactions'] or 0) + 1 for course in courses],
+                artifacts
+            )
+            if embedding is None:
+                # None of the catalog is in the model
+                embedding = artifacts.user_embeddings[0]
+            prior = (artifacts.version, catalog.version, embedding)
+            self.prior = prior
+        return prior[2]
+    
     def get_model(self):
         """
-        Get the content-based recommendation model.
+        Get the colaborative recommendation model, loading it on first use.
         
         Returns:
-            The content-based recommendation model.
+            The colaborative recommendation model.
         """
+        if self.model is None:
+            with self._model_lock:
+                if self.model is None:
+                    self.model = self._load_network()
         return self.model
     
     def get_recommendations_by_user_id(self, user_id, n):
@@ -204,21 +350,51 @@ class CollaborativeModel:
             k (int): The number of recommendations to return.
         
         Returns:
-            List of recommended course IDs.
+            Tuple of (recommended courses, model version used).
         """
-        if not self.model:
+        artifacts = self.artifacts
+        if not artifacts:
             raise ValueError("Model is not loaded. Please initialize the model first.")
         
-        model = self.get_model()
-        scores, ids = model(tf.constant([user_id]), k=n)
-        recommended_course_ids = [cid.numpy().decode() for cid in ids[0]]
+        # Serve from the precomputed table when it is deep enough, else score live
+        user_row = artifacts.row_by_user_id.get(user_id, 0)
+        user_embedding = artifacts.user_embeddings[user_row]
+        if artifacts.user_top is not None and n <= artifacts.user_top.shape[1]:
+            rows = artifacts.user_top[user_row, :n]
+        else:
+            rows = self.batcher.submit((artifacts, user_embedding, n))
         
-        # Fetch course details from the database
-        recommended_courses = []
-        for course_id in recommended_course_ids:
-            course = Course.query.filter_by(course_id=course_id).first()
-            if course:
-                recommended_courses.append(course.to_dict())
+        return self._hydrate(artifacts, rows, user_embedding), artifacts.version
+    
+    def get_recommendations_by_user_embedding(self, user_embedding, n, exclude_course_ids=(), artifacts=None):
+        """
+        Get recommendations for a user embedding, such as one from `fold_in_user`.
         
-        return recommended_courses
-
+        Args:
+            user_embedding (np.ndarray): The (embedding_dim,) user embedding.
+            n (int): The number of recommendations to return.
+            exclude_course_ids (list[int]): Courses to leave out, e.g. the ones
+                the user already interacted with.
+            artifacts (CollaborativeArtifacts): The model version the embedding
+                was computed with. Defaults to the current one.
+        
+        Returns:
+            Tuple of (recommended courses, model version used).
+        """
+        artifacts = artifacts or self.artifacts
+        
+        # Retrieve deep enough that n remain once the excluded courses are dropped
+        exclude_rows = [
+            artifacts.row_by_course_id[str(course_id)]
+            for course_id in set(exclude_course_ids) if str(course_id) in artifacts.row_by_course_id
+        ]
+        rows = self.batcher.submit((artifacts, user_embedding, n + len(exclude_rows)))
+        rows = rows[~np.isin(rows, exclude_rows)][:n]
+        
+        return self._hydrate(artifacts, rows, user_embedding), artifacts.version
+    
+    @staticmethod
+    def _hydrate(artifacts, rows, user_embedding):
+        # Fetch course details from the database in rank order, with their scores
+        scores = artifacts.candidate_embeddings[rows] @ user_embedding
+        return hydrate_courses(artifacts.candidate_ids[rows].tolist(), scores)
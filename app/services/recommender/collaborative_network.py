@@ -0,0 +1,121 @@
+import tensorflow as tf
+import tensorflow_recommenders as tfrs
+
+# os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+# os.environ['TF_USE_LEGACY_KERAS'] = '1'
+
+# ⬇️ Inherit dari TFRS (TensorFlow Recommenders)
+class CourseModel(tfrs.Model):
+    def __init__(self, user_vocab, course_vocab, embedding_dim=64):
+        super().__init__()
+
+        # ================================
+        # Simpan parameter sebagai atribut
+        # Penting untuk get_config agar bisa serialisasi dengan benar
+        # ================================
+        self.user_vocab = user_vocab
+        self.course_vocab = course_vocab
+        self.embedding_dim = embedding_dim
+
+        # Tambahkan metrik total_loss eksplisit
+        self.total_loss_tracker = tf.keras.metrics.Mean(name="total_loss")
+
+        # ================================
+        # 🏛 USER TOWER
+        # Ubah user_id (string) ➜ index ➜ embedding
+        # ================================
+        self.user_model = tf.keras.Sequential([
+            tf.keras.layers.StringLookup(
+                vocabulary=user_vocab,   # daftar semua user_id
+                mask_token=None          # tidak pakai token khusus untuk "kosong"
+            ),
+            tf.keras.layers.Embedding(
+                input_dim=len(user_vocab) + 1,
+                output_dim=embedding_dim
+            )
+        ])
+
+        # ================================
+        # 🏫 COURSE TOWER
+        # Ubah course_id (string) ➜ index ➜ embedding
+        # ================================
+        self.course_model = tf.keras.Sequential([
+            tf.keras.layers.StringLookup(
+                vocabulary=course_vocab,
+                mask_token=None
+            ),
+            tf.keras.layers.Embedding(
+                input_dim=len(course_vocab) + 1,
+                output_dim=embedding_dim
+            )
+        ])
+
+        # =======================================
+        # 🎯 RETRIEVAL TASK (dengan evaluasi Top-K)
+        # Tujuannya adalah: buat user dan course relevan
+        # saling mendekat di ruang embedding
+        # =======================================
+        self.task = tfrs.tasks.Retrieval(
+            metrics=tfrs.metrics.FactorizedTopK(
+                candidates=tf.data.Dataset.from_tensor_slices(course_vocab)
+                    .batch(128)
+                    .map(self.course_model)  # konversi course_id ➜ embedding
+            )
+        )
+
+    # ============================================
+    # 🚀 call
+    # Definisi forward pass model
+    # Input: fitur berisi 'user_id' dan 'course_id'
+    # Output: embedding vektor untuk user dan course
+    # Dipakai saat inference dan saat menyimpan model
+    # ============================================
+    def call(self, features):
+        user_embeddings = self.user_model(features['user_id'])
+        course_embeddings = self.course_model(features['course_id'])
+        return user_embeddings, course_embeddings
+
+    # ============================================
+    # ⚙️ get_config
+    # Mengembalikan konfigurasi model dalam bentuk dictionary
+    # Konfigurasi ini berisi parameter penting untuk membangun ulang model
+    # Berguna untuk menyimpan dan memuat model subclass dengan benar
+    # ============================================
+    def get_config(self):
+        return {
+            'user_vocab': self.user_vocab,
+            'course_vocab': self.course_vocab,
+            'embedding_dim': self.embedding_dim
+        }
+
+    # ============================================
+    # 🏗️ from_config (classmethod)
+    # Membuat instance model baru dari konfigurasi yang disimpan
+    # Memungkinkan reconstruct model dengan parameter yang sama saat loading
+    # ============================================
+    @classmethod
+    def from_config(cls, config):
+        return cls(**config)
+
+    # ============================================
+    # 🔁 compute_loss
+    # Fungsi utama saat training untuk menghitung loss
+    # input = features['user_id'] dan ['course_id']
+    # output = loss dari user-course pairs
+    # ============================================
+    def compute_loss(self, features, training=False):
+        user_embeddings = self.user_model(features['user_id'])
+        course_embeddings = self.course_model(features['course_id'])
+        loss = self.task(user_embeddings, course_embeddings)
+        self.total_loss_tracker.update_state(loss)
+        return loss
+
+    # ============================================
+    # 📊 metrics
+    # properti agar total_loss dikenali sebagai metrik oleh callback dan bisa di-iterasi oleh Keras
+    # ============================================
+    @property # Tambahkan dekorator ini!
+    def metrics(self):
+        # Pastikan ini mengembalikan daftar objek metrik
+        # Termasuk metrik dari TFRS task jika kamu ingin juga dimonitor secara langsung oleh Keras
+        return [self.total_loss_tracker] + self.task.metrics # self.task.metrics sudah list
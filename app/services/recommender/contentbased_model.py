@@ -1,189 +1,250 @@
 from threading import Lock
 from pathlib import Path
-import tensorflow as tf
-import os
-from app.models.course import Course
-from app.extensions import db
-import pandas as pd
-import tensorflow_recommenders as tfrs
-from tensorflow import keras
+from app.config import Config
+from app.services.course.catalog_cache import get_course_record
+from app.services.course.hydrate import get_courses_by_ids, hydrate_courses
+from app.services.recommender.artifacts import get_export_dir, export_lock, load_or_build_array, save_array, save_arrays
+from app.services.recommender.contentbased_numpy import NumpyCourseNetwork
+from app.services.recommender.ann_index import load_or_build_index, search_batch
+from app.services.recommender.batching import MicroBatcher
+from app.services.recommender.reloading import HotSwappableModel
+from app.services.recommender.top_k import top_k, top_k_neighbours
+import numpy as np
 import pickle
 
-# os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
-# os.environ['TF_USE_LEGACY_KERAS'] = '1'
-
-df_courses = pd.read_csv(
-    Path(__file__).parent.parent.parent.parent / "ml_model" / "content_based" / "udemy_courses_new.csv"
-)
-
-# 🔁 Load scaler hasil training
-scaler_path = Path(__file__).parent.parent.parent.parent / "ml_model" / "content_based" / "scaler.pkl"
-with open(scaler_path, "rb") as f:
-    scaler = pickle.load(f)
-
-# 📊 Normalisasi fitur numerik menggunakan scaler dari training
-numerical_features = ['price', 'num_subscribers', 'num_reviews', 'num_lectures', 'content_duration']
-df_courses[numerical_features] = scaler.transform(df_courses[numerical_features])
-
-class CourseModel(tf.keras.Model):
-    def __init__(self, embedding_dim, subject_vocab, level_vocab, course_ids, vectorizer_path=None):
-        super().__init__()
-
-        # Embedding categorical features
-        self.course_embedding = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(vocabulary=course_ids, mask_token=None),
-            tf.keras.layers.Embedding(len(course_ids) + 1, embedding_dim)
-        ])
-
-        self.subject_embedding = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(vocabulary=subject_vocab, mask_token=None),
-            tf.keras.layers.Embedding(len(subject_vocab) + 1, max(4, embedding_dim // 4))
-        ])
-
-        self.level_embedding = tf.keras.Sequential([
-            tf.keras.layers.StringLookup(vocabulary=level_vocab, mask_token=None),
-            tf.keras.layers.Embedding(len(level_vocab) + 1, max(2, embedding_dim // 8))
-        ])
-
-        # ⬇️ Perbedaan penting ada di sini
-        if vectorizer_path:
-            # Inference mode: load saved vectorizer
-            self.title_vectorizer = tf.keras.models.load_model(vectorizer_path, compile=False)
-        else:
-            # Training mode: adapt vectorizer
-            self.title_vectorizer = tf.keras.layers.TextVectorization(max_tokens=1000, output_mode='tf-idf')
-            self.title_vectorizer.adapt(df_courses["course_title"].astype(str).tolist())
-
-        self.title_embedding = tf.keras.Sequential([
-            self.title_vectorizer,
-            tf.keras.layers.Dense(embedding_dim, activation="relu"),
-        ])
-
-        self.numerical_dense = tf.keras.Sequential([
-            tf.keras.layers.Dense(embedding_dim // 4, activation="relu"),
-            tf.keras.layers.Dense(embedding_dim // 8, activation="relu"),
-        ])
-
-        self.final_dense1 = tf.keras.layers.Dense(embedding_dim * 2, activation="relu")
-        self.final_dense2 = tf.keras.layers.Dense(embedding_dim)
-
-    def call(self, inputs):
-        title = inputs["course_title"]
-
-        # Gabungkan fitur numerik dalam satu tensor
-        numerical = tf.stack([
-            inputs["price"],
-            inputs["num_subscribers"],
-            inputs["num_reviews"],
-            inputs["num_lectures"],
-            inputs["content_duration"],
-        ], axis=1)
-
-        # Dapatkan embedding masing-masing fitur
-        course_emb = self.course_embedding(inputs["course_id"])
-        subject_emb = self.subject_embedding(inputs["subject"])
-        level_emb = self.level_embedding(inputs["level"])
-        title_emb = self.title_embedding(title)
-        numerical_emb = self.numerical_dense(numerical)
-
-        # ⚡ Concatenate semua embedding jadi satu vector feature
-        concat = tf.concat([course_emb, subject_emb, level_emb, title_emb, numerical_emb], axis=1)
-
-        x = self.final_dense1(concat)
-        return self.final_dense2(x)  # Output embedding final untuk course
-
-# Function untuk Membuat dataset TensorFlow train & test
-def make_tf_dataset(df, shuffle=True, batch_size=64):
-    ds = tf.data.Dataset.from_tensor_slices({
-        "course_id": df["course_id"].astype(str).values,
-        "course_title": df["course_title"].astype(str).values.reshape(-1),
-        "subject": df["subject"].astype(str).values,
-        "level": df["level"].astype(str).values,
-        "price": df["price"].astype("float32").values,
-        "num_subscribers": df["num_subscribers"].astype("float32").values,
-        "num_reviews": df["num_reviews"].astype("float32").values,
-        "num_lectures": df["num_lectures"].astype("float32").values,
-        "content_duration": df["content_duration"].astype("float32").values,
-    })
-    if shuffle:
-        ds = ds.shuffle(1000)
-    ds = ds.batch(batch_size).cache().prefetch(tf.data.AUTOTUNE)
-    return ds
+class ContentBasedArtifacts:
+    """
+    The serving arrays of one content-based model version.
+    
+    A snapshot is never modified once built, so a request that holds on to it
+    keeps a consistent view while a newer version is swapped in.
+    """
+    
+    def __init__(self, version, candidate_ids, candidate_embeddings, neighbours, index, network):
+        self.version = version
+        self.candidate_ids = candidate_ids
+        self.candidate_embeddings = candidate_embeddings
+        self.row_by_course_id = {int(course_id): row for row, course_id in enumerate(candidate_ids)}
+        self.neighbours = neighbours
+        self.index = index
+        self.network = network
 
-class ContentBasedModel:
+class ContentBasedModel(HotSwappableModel):
     """
     A class to represent a content-based recommendation model.
     """
     _instance = None
     _lock = Lock()
+    _model_lock = Lock()
+    _reload_lock = Lock()
     
     model = None
-    index = None
+    model_dir = None
+    batcher = None
     
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             with cls._lock:
                 if not cls._instance:
-                    cls._instance = super().__new__(cls)
+                    instance = super().__new__(cls)
                     
                     # Initialize the model
-                    cls._instance._load_model()
+                    instance._load_model()
+                    cls._instance = instance
         return cls._instance
     
     def _load_model(self):
         """
         Load the content-based recommendation model.
-        This is a placeholder for the actual model loading logic.
+        
+        The serving arrays (candidate ids and embeddings, neighbour table and
+        index) are exported once per model version and memory-mapped, so every
+        worker shares one copy. The network weights are exported alongside for
+        the NumPy forward pass, so TensorFlow is only loaded when an artifact
+        still has to be built.
         """
         
         # Dynamically construct the path to the saved model directory
         model_dir = Path(__file__).parent.parent.parent.parent / "ml_model" / "content_based"
         
         if model_dir.exists():
-            with open(model_dir / "course_ids.pkl", "rb") as f:
-                loaded_course_ids = pickle.load(f)
-            with open(model_dir / "subject_vocab.pkl", "rb") as f:
-                loaded_subject_vocab = pickle.load(f)
-            with open(model_dir / "level_vocab.pkl", "rb") as f:
-                loaded_level_vocab = pickle.load(f)
-                
-            vectorizer_path = model_dir / "title_vectorizer_model"
-                
-            loaded_model = CourseModel(
-                embedding_dim=64,  # match the embedding_dim used during training
-                subject_vocab=loaded_subject_vocab,  # load subject vocab from the saved file
-                level_vocab=loaded_level_vocab,  # load level vocab from the saved file
-                course_ids=loaded_course_ids,  # load course IDs from the saved file
-                vectorizer_path=vectorizer_path  # ⬅️ Ini penting
-            )
-            
-            # Compile the loaded model as done during training
-            loaded_model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.0008901416500660483))
-
-            # Load the model weights
-            loaded_model.load_weights(model_dir / "model weights" / "model_weights")
+            self.model_dir = model_dir
             
-            self.model = loaded_model
-            
-            tf_all_courses = make_tf_dataset(df_courses, batch_size=64, shuffle=False)
-            
-            loaded_index = tfrs.layers.factorized_top_k.BruteForce(loaded_model)
-            loaded_index.index_from_dataset(
-                tf_all_courses.map(lambda x: (x["course_id"], loaded_model(x)))
+            # Coalesce concurrent live queries into one matrix product
+            self.batcher = MicroBatcher(
+                search_batch,
+                window_ms=Config.RECOMMENDER_BATCH_WINDOW_MS,
+                max_batch_size=Config.RECOMMENDER_MAX_BATCH_SIZE,
+                name="content-based-batcher"
             )
             
-            self.index = loaded_index
+            self.reload()
 
         else:
             raise FileNotFoundError(f"Model directory {model_dir} does not exist. Please ensure the model is saved correctly.")
+    
+    def _get_artifact_paths(self):
+        model_dir = self.model_dir
+        return [
+            model_dir / "model weights",
+            model_dir / "course_ids.pkl",
+            model_dir / "subject_vocab.pkl",
+            model_dir / "level_vocab.pkl",
+            model_dir / "scaler.pkl",
+            model_dir / "title_vectorizer_model",
+            model_dir / "udemy_courses_new.csv",
+        ]
+    
+    def _load_artifacts(self, version):
+        """
+        Attach to the exported serving arrays of a model version, building any
+        that are missing.
+        """
+        export_dir = get_export_dir("content_based", version)
+        
+        # The Keras network of the previous version must not be reused for builds
+        with self._model_lock:
+            self.model = None
+        
+        candidate_ids = load_or_build_array(export_dir / "candidate_ids.npy", self._load_course_ids)
+        candidate_embeddings = load_or_build_array(
+            export_dir / "candidate_embeddings.npy",
+            lambda: self._embed_candidates(candidate_ids)
+        )
+        
+        # Course-to-course neighbours are deterministic for a given model, so the
+        # top-K table is computed once per model version and reused from disk
+        neighbours = load_or_build_array(
+            self._get_neighbours_path(version),
+            lambda: top_k_neighbours(candidate_embeddings, Config.NEIGHBOUR_TABLE_SIZE)
+        )
+        index = load_or_build_index(candidate_embeddings, export_dir)
+        
+        # Courses missing from the index are embedded with the NumPy network
+        network_path = self._get_network_path(version)
+        if not network_path.exists():
+            with export_lock(export_dir):
+                if not network_path.exists():
+                    self._export_network(network_path)
+        
+        return ContentBasedArtifacts(
+            version=version,
+            candidate_ids=candidate_ids,
+            candidate_embeddings=candidate_embeddings,
+            neighbours=neighbours,
+            index=index,
+            network=NumpyCourseNetwork(network_path)
+        )
+    
+    def _load_course_ids(self):
+        with open(self.model_dir / "course_ids.pkl", "rb") as f:
+            return np.asarray(pickle.load(f))
+    
+    def _load_network(self):
+        """
+        Build the Keras course network and restore its trained weights.
+        """
+        model_dir = self.model_dir
+        
+        # TensorFlow is only imported once a process actually needs the network
+        import tensorflow as tf
+        from app.services.recommender.contentbased_network import CourseModel, load_course_frame, load_scaler, make_tf_dataset
+        
+        # The training data and scaler may have been replaced since they were cached
+        load_scaler.cache_clear()
+        load_course_frame.cache_clear()
+        
+        with open(model_dir / "course_ids.pkl", "rb") as f:
+            loaded_course_ids = pickle.load(f)
+        with open(model_dir / "subject_vocab.pkl", "rb") as f:
+            loaded_subject_vocab = pickle.load(f)
+        with open(model_dir / "level_vocab.pkl", "rb") as f:
+            loaded_level_vocab = pickle.load(f)
+            
+        vectorizer_path = model_dir / "title_vectorizer_model"
+            
+        loaded_model = CourseModel(
+            embedding_dim=48,  # match the embedding_dim used during training
+            subject_vocab=loaded_subject_vocab,  # load subject vocab from the saved file
+            level_vocab=loaded_level_vocab,  # load level vocab from the saved file
+            course_ids=loaded_course_ids,  # load course IDs from the saved file
+            vectorizer_path=vectorizer_path  # ⬅️ Ini penting
+        )
+        
+        # Compile the loaded model as done during training
+        loaded_model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.0008901416500660483))
+
+        # Load the model weights. The checkpoint was written from the training
+        # wrapper, which holds this network under its `course_model` attribute.
+        tf.train.Checkpoint(course_model=loaded_model).restore(
+            str(model_dir / "model weights" / "model_weights")
+        ).expect_partial()
+        
+        # Build the layers with one forward pass so the restored weights are in place
+        loaded_model(next(iter(make_tf_dataset(load_course_frame().iloc[:1], shuffle=False))))
+        
+        return loaded_model
+    
+    def _embed_candidates(self, candidate_ids):
+        """
+        Embed every course into a contiguous float32 matrix, row-aligned with
+        course_ids.pkl, so serving is a plain matmul.
+        """
+        from app.services.recommender.contentbased_network import load_course_frame, make_tf_dataset
+        
+        model = self.get_model()
+        df_courses = load_course_frame()
+        tf_all_courses = make_tf_dataset(df_courses, batch_size=64, shuffle=False)
+        embeddings = np.concatenate([model(batch).numpy() for batch in tf_all_courses])
+        
+        row_by_course_id = {course_id: row for row, course_id in enumerate(df_courses["course_id"].astype(str))}
+        rows = [row_by_course_id[course_id] for course_id in candidate_ids]
+        
+        return np.ascontiguousarray(embeddings[rows], dtype=np.float32)
+        
+    def _get_network_path(self, version):
+        return get_export_dir("content_based", version) / "course_network.npz"
+    
+    def _export_network(self, path):
+        from app.services.recommender.contentbased_network import load_scaler
+        from app.services.recommender.contentbased_numpy import export_course_network
         
+        save_arrays(path, export_course_network(self.get_model(), load_scaler()))
+    
+    def export_network(self):
+        """
+        Export the weights and vocabularies of the Keras network for the NumPy
+        forward pass, overwriting any exported copy of the current model version.
+        """
+        artifacts = self.artifacts
+        network_path = self._get_network_path(artifacts.version)
+        self._export_network(network_path)
+        self._replace_artifacts(artifacts, network=NumpyCourseNetwork(network_path))
+    
+    def _get_neighbours_path(self, version):
+        return get_export_dir("content_based", version) / f"neighbours_{Config.NEIGHBOUR_TABLE_SIZE}.npy"
+    
+    def rebuild_neighbours(self):
+        """
+        Recompute the course-to-course neighbour table of the current model
+        version and overwrite the exported copy.
+        """
+        artifacts = self.artifacts
+        neighbours_path = self._get_neighbours_path(artifacts.version)
+        save_array(neighbours_path, top_k_neighbours(artifacts.candidate_embeddings, Config.NEIGHBOUR_TABLE_SIZE))
+        self._replace_artifacts(artifacts, neighbours=np.load(neighbours_path, mmap_mode="r"))
+    
     def get_model(self):
         """
-        Get the content-based recommendation model.
+        Get the content-based recommendation model, loading it on first use.
         
         Returns:
             The content-based recommendation model.
         """
+        if self.model is None:
+            with self._model_lock:
+                if self.model is None:
+                    self.model = self._load_network()
         return self.model
     
     def get_index(self):
@@ -191,45 +252,117 @@ class ContentBasedModel:
         Get the index for the content-based recommendation model.
         
         Returns:
-            The index for the content-based recommendation model.
+            The (n_courses, embedding_dim) float32 candidate embedding matrix,
+            row-aligned with `candidate_ids`.
+        """
+        return self.artifacts.candidate_embeddings
+    
+    def get_query_embedding(self, course_id, artifacts=None):
         """
-        return self.index
+        Get the embedding of a query course.
+        
+        Courses in the index are read straight from the precomputed candidate
+        matrix, so no model call happens. Only courses missing from the index
+        are embedded from their database row, with the NumPy forward pass of
+        the network.
+        
+        Args:
+            course_id (int): The course ID to embed.
+            artifacts (ContentBasedArtifacts): The model version to use.
+                Defaults to the current one.
+        
+        Returns:
+            The (embedding_dim,) float32 embedding of the course.
+        """
+        artifacts = artifacts or self.artifacts
+        row = artifacts.row_by_course_id.get(course_id)
+        if row is not None:
+            return artifacts.candidate_embeddings[row]
+        
+        # Check if course_id exists in the catalog
+        course = get_course_record(course_id)
+        if not course:
+            raise ValueError(f"Course with ID {course_id} does not exist.")
+        
+        return artifacts.network.embed([course])[0]
     
     def get_recommendations_by_course_id(self, course_id, n):
+        """
+        Get recommendations for a given course ID.
+        
+        Returns:
+            Tuple of (recommended courses, model version used).
+        """
         # Check if course_id is valid
         if not isinstance(course_id, int):
             raise ValueError("course_id must be an integer.")
         
-        # Check if course_id exists in the database
-        course = Course.query.filter_by(course_id=course_id).first()
-        if not course:
-            raise ValueError(f"Course with ID {course_id} does not exist.")
+        # Every lookup of this request uses the same model version
+        artifacts = self.artifacts
         
-        # Get the model
-        index = self.get_index()
-        
-        # Prepare the input for the model
-        query_features = {
-            "course_id": tf.constant([str(course.course_id)]),
-            "course_title": tf.constant([course.course_title]),
-            "subject": tf.constant([course.subject]),
-            "level": tf.constant([course.level]),
-            "price": tf.constant([course.price], dtype=tf.float32),
-            "num_subscribers": tf.constant([course.num_subscribers], dtype=tf.float32),
-            "num_reviews": tf.constant([course.num_reviews], dtype=tf.float32),
-            "num_lectures": tf.constant([course.num_lectures], dtype=tf.float32),
-            "content_duration": tf.constant([course.content_duration], dtype=tf.float32),
-        }
-        
-        # Get recommendations from the model
-        scores, ids = index(query_features, k=n)
-        
-        recommendations = []
-
-        recommended_ids = [id.numpy().decode('utf-8') for id in ids[0]]
-
-        recommended_courses = Course.query.filter(Course.course_id.in_(recommended_ids)).all()
-        recommendations = [course.to_dict() for course in recommended_courses]
-
-        return recommendations
+        # Indexed courses within the precomputed table are a plain slice; anything
+        # else is scored against every candidate, batched with concurrent queries
+        query_embedding = self.get_query_embedding(course_id, artifacts)
+        row = artifacts.row_by_course_id.get(course_id)
+        if row is not None and n <= artifacts.neighbours.shape[1]:
+            rows = artifacts.neighbours[row, :n]
+        else:
+            rows = self.batcher.submit((artifacts, query_embedding, n))
+        
+        scores = artifacts.candidate_embeddings[rows] @ query_embedding
+        recommendations = hydrate_courses(artifacts.candidate_ids[rows].tolist(), scores)
 
+        return recommendations, artifacts.version
+    
+    def get_recommendations_by_course_ids(self, course_ids, n):
+        """
+        Get recommendations for several seed courses at once.
+        
+        All seeds are searched in a single batched index call.
+        
+        Args:
+            course_ids (list[int]): The seed course IDs.
+            n (int): The number of recommendations per seed and in the merged list.
+        
+        Returns:
+            Tuple of (recommendations, model version used). The recommendations
+            are a dict with 'seeds', a list of {'course_id', 'courses'} entries
+            in seed order, and 'merged', a deduplicated list ranked by each
+            course's best score across all seeds, excluding the seeds themselves.
+        """
+        if not all(isinstance(course_id, int) for course_id in course_ids):
+            raise ValueError("course_ids must be integers.")
+        
+        course_ids = list(dict.fromkeys(course_ids))
+        if not course_ids:
+            raise ValueError("At least one course_id is required.")
+        
+        artifacts = self.artifacts
+        query_embeddings = np.stack([self.get_query_embedding(course_id, artifacts) for course_id in course_ids])
+        
+        # Search deep enough that the merged list is still exact once the seeds are dropped
+        scores, rows = artifacts.index.search(query_embeddings, n + len(course_ids))
+        seed_rows, seed_scores = rows[:, :n], scores[:, :n]
+        
+        # Keep each retrieved course's best score across all seeds
+        seed_index_rows = [artifacts.row_by_course_id[course_id] for course_id in course_ids if course_id in artifacts.row_by_course_id]
+        keep = ~np.isin(rows, seed_index_rows)
+        unique_rows, inverse = np.unique(rows[keep], return_inverse=True)
+        merged_scores = np.full(len(unique_rows), -np.inf, dtype=scores.dtype)
+        np.maximum.at(merged_scores, inverse, scores[keep])
+        merged_scores, merged_order = top_k(merged_scores, n)
+        merged_rows = unique_rows[merged_order]
+        
+        # Hydrate every recommended course with one fetch
+        course_by_id = get_courses_by_ids(artifacts.candidate_ids[np.union1d(seed_rows.ravel(), merged_rows)].tolist())
+        
+        def hydrate(rows, scores):
+            return hydrate_courses(artifacts.candidate_ids[rows].tolist(), scores, course_by_id)
+        
+        return {
+            'seeds': [
+                {'course_id': course_id, 'courses': hydrate(rows, scores)}
+                for course_id, rows, scores in zip(course_ids, seed_rows, seed_scores)
+            ],
+            'merged': hydrate(merged_rows, merged_scores)
+        }, artifacts.version
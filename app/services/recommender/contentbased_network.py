@@ -0,0 +1,111 @@
+from functools import lru_cache
+from pathlib import Path
+import tensorflow as tf
+import pandas as pd
+import pickle
+
+# os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+# os.environ['TF_USE_LEGACY_KERAS'] = '1'
+
+MODEL_DIR = Path(__file__).parent.parent.parent.parent / "ml_model" / "content_based"
+
+numerical_features = ['price', 'num_subscribers', 'num_reviews', 'num_lectures', 'content_duration']
+
+@lru_cache(maxsize=None)
+def load_scaler():
+    # 🔁 Load scaler hasil training
+    with open(MODEL_DIR / "scaler.pkl", "rb") as f:
+        return pickle.load(f)
+
+@lru_cache(maxsize=None)
+def load_course_frame():
+    df_courses = pd.read_csv(MODEL_DIR / "udemy_courses_new.csv")
+    
+    # 📊 Normalisasi fitur numerik menggunakan scaler dari training
+    df_courses[numerical_features] = load_scaler().transform(df_courses[numerical_features])
+    return df_courses
+
+class CourseModel(tf.keras.Model):
+    def __init__(self, embedding_dim, subject_vocab, level_vocab, course_ids, vectorizer_path=None):
+        super().__init__()
+
+        # Embedding categorical features
+        self.course_embedding = tf.keras.Sequential([
+            tf.keras.layers.StringLookup(vocabulary=course_ids, mask_token=None),
+            tf.keras.layers.Embedding(len(course_ids) + 1, embedding_dim)
+        ])
+
+        self.subject_embedding = tf.keras.Sequential([
+            tf.keras.layers.StringLookup(vocabulary=subject_vocab, mask_token=None),
+            tf.keras.layers.Embedding(len(subject_vocab) + 1, max(4, embedding_dim // 4))
+        ])
+
+        self.level_embedding = tf.keras.Sequential([
+            tf.keras.layers.StringLookup(vocabulary=level_vocab, mask_token=None),
+            tf.keras.layers.Embedding(len(level_vocab) + 1, max(2, embedding_dim // 8))
+        ])
+
+        # ⬇️ Perbedaan penting ada di sini
+        if vectorizer_path:
+            # Inference mode: load saved vectorizer
+            self.title_vectorizer = tf.keras.models.load_model(vectorizer_path, compile=False)
+        else:
+            # Training mode: adapt vectorizer
+            self.title_vectorizer = tf.keras.layers.TextVectorization(max_tokens=1000, output_mode='tf-idf')
+            self.title_vectorizer.adapt(load_course_frame()["course_title"].astype(str).tolist())
+
+        self.title_embedding = tf.keras.Sequential([
+            self.title_vectorizer,
+            tf.keras.layers.Dense(embedding_dim, activation="relu"),
+        ])
+
+        self.numerical_dense = tf.keras.Sequential([
+            tf.keras.layers.Dense(embedding_dim // 4, activation="relu"),
+            tf.keras.layers.Dense(embedding_dim // 8, activation="relu"),
+        ])
+
+        self.final_dense1 = tf.keras.layers.Dense(embedding_dim * 2, activation="relu")
+        self.final_dense2 = tf.keras.layers.Dense(embedding_dim)
+
+    def call(self, inputs):
+        title = inputs["course_title"]
+
+        # Gabungkan fitur numerik dalam satu tensor
+        numerical = tf.stack([
+            inputs["price"],
+            inputs["num_subscribers"],
+            inputs["num_reviews"],
+            inputs["num_lectures"],
+            inputs["content_duration"],
+        ], axis=1)
+
+        # Dapatkan embedding masing-masing fitur
+        course_emb = self.course_embedding(inputs["course_id"])
+        subject_emb = self.subject_embedding(inputs["subject"])
+        level_emb = self.level_embedding(inputs["level"])
+        title_emb = self.title_embedding(title)
+        numerical_emb = self.numerical_dense(numerical)
+
+        # ⚡ Concatenate semua embedding jadi satu vector feature
+        concat = tf.concat([course_emb, subject_emb, level_emb, title_emb, numerical_emb], axis=1)
+
+        x = self.final_dense1(concat)
+        return self.final_dense2(x)  # Output embedding final untuk course
+
+# Function untuk Membuat dataset TensorFlow train & test
+def make_tf_dataset(df, shuffle=True, batch_size=64):
+    ds = tf.data.Dataset.from_tensor_slices({
+        "course_id": df["course_id"].astype(str).values,
+        "course_title": df["course_title"].astype(str).values.reshape(-1),
+        "subject": df["subject"].astype(str).values,
+        "level": df["level"].astype(str).values,
+        "price": df["price"].astype("float32").values,
+        "num_subscribers": df["num_subscribers"].astype("float32").values,
+        "num_reviews": df["num_reviews"].astype("float32").values,
+        "num_lectures": df["num_lectures"].astype("float32").values,
+        "content_duration": df["content_duration"].astype("float32").values,
+    })
+    if shuffle:
+        ds = ds.shuffle(1000)
+    ds = ds.batch(batch_size).cache().prefetch(tf.data.AUTOTUNE)
+    return ds
@@ -0,0 +1,120 @@
+import re
+from collections.abc import Mapping
+
+import numpy as np
+
+# Mirrors TextVectorization's 'lower_and_strip_punctuation' standardisation and 'whitespace' split
+STRIP_PUNCTUATION = re.compile(r'[!"#$%&()\*\+,-\./:;<=>?@\[\\\]^_`{|}~\']')
+WHITESPACE = re.compile(r'[ \t\n\r\v\f]+')
+# tf.strings.lower only lowercases ASCII letters
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+NUMERICAL_FEATURES = ['price', 'num_subscribers', 'num_reviews', 'num_lectures', 'content_duration']
+
+def export_course_network(model, scaler):
+    """
+    Collect the weights and vocabularies of a Keras content-based CourseModel.
+
+    Args:
+        model (CourseModel): The trained Keras network, already built.
+        scaler (MinMaxScaler): The scaler the numeric features were trained with.
+
+    Returns:
+        Dict of named arrays, to be saved as a .npz file.
+    """
+    title_vectorizer = model.title_vectorizer.layers[0] if hasattr(model.title_vectorizer, "layers") else model.title_vectorizer
+    title_dense = model.title_embedding.layers[-1]
+    numerical_dense1, numerical_dense2 = model.numerical_dense.layers
+
+    return {
+        "course_vocab": np.asarray(model.course_embedding.layers[0].get_vocabulary()),
+        "course_embeddings": model.course_embedding.layers[1].embeddings.numpy(),
+        "subject_vocab": np.asarray(model.subject_embedding.layers[0].get_vocabulary()),
+        "subject_embeddings": model.subject_embedding.layers[1].embeddings.numpy(),
+        "level_vocab": np.asarray(model.level_embedding.layers[0].get_vocabulary()),
+        "level_embeddings": model.level_embedding.layers[1].embeddings.numpy(),
+        "title_vocab": np.asarray(title_vectorizer.get_vocabulary()),
+        "title_idf": title_vectorizer._lookup_layer.idf_weights.numpy(),
+        "title_kernel": title_dense.kernel.numpy(),
+        "title_bias": title_dense.bias.numpy(),
+        "numerical_kernel1": numerical_dense1.kernel.numpy(),
+        "numerical_bias1": numerical_dense1.bias.numpy(),
+        "numerical_kernel2": numerical_dense2.kernel.numpy(),
+        "numerical_bias2": numerical_dense2.bias.numpy(),
+        "final_kernel1": model.final_dense1.kernel.numpy(),
+        "final_bias1": model.final_dense1.bias.numpy(),
+        "final_kernel2": model.final_dense2.kernel.numpy(),
+        "final_bias2": model.final_dense2.bias.numpy(),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float32),
+        "scaler_min": np.asarray(scaler.min_, dtype=np.float32),
+    }
+
+class NumpyCourseNetwork:
+    """
+    NumPy forward pass of the content-based CourseModel.
+
+    Reproduces the Keras network from the arrays exported by
+    `export_course_network`, so courses can be embedded without TensorFlow.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (Path): The .npz file holding the arrays from `export_course_network`.
+        """
+        with np.load(path) as weights:
+            self.weights = {name: weights[name] for name in weights.files}
+
+        # StringLookup reserves index 0 for out-of-vocabulary values
+        self.lookups = {
+            name: {token: index for index, token in enumerate(self.weights[f"{name}_vocab"].tolist()) if index > 0}
+            for name in ("course", "subject", "level", "title")
+        }
+
+    def _lookup(self, name, values):
+        lookup = self.lookups[name]
+        return np.array([lookup.get(value, 0) for value in values], dtype=np.intp)
+
+    def _tf_idf(self, titles):
+        lookup = self.lookups["title"]
+        counts = np.zeros((len(titles), len(self.weights["title_vocab"])), dtype=np.float32)
+        for row, title in enumerate(titles):
+            tokens = WHITESPACE.split(STRIP_PUNCTUATION.sub("", title.translate(ASCII_LOWER)))
+            for token in tokens:
+                if token:
+                    counts[row, lookup.get(token, 0)] += 1
+        return counts * self.weights["title_idf"]
+
+    @staticmethod
+    def _relu(x):
+        return np.maximum(x, 0)
+
+    def embed(self, courses):
+        """
+        Embed courses.
+
+        Args:
+            courses (list): Objects or mappings with course_id, course_title, subject,
+                level and the raw (unscaled) numeric course features.
+
+        Returns:
+            The (n_courses, embedding_dim) float32 course embeddings.
+        """
+        get = lambda course, name: course[name] if isinstance(course, Mapping) else getattr(course, name)
+        w = self.weights
+
+        numerical = np.array(
+            [[get(course, feature) for feature in NUMERICAL_FEATURES] for course in courses],
+            dtype=np.float32
+        ) * w["scaler_scale"] + w["scaler_min"]
+
+        concat = np.concatenate([
+            w["course_embeddings"][self._lookup("course", [str(get(course, "course_id")) for course in courses])],
+            w["subject_embeddings"][self._lookup("subject", [get(course, "subject") for course in courses])],
+            w["level_embeddings"][self._lookup("level", [get(course, "level") for course in courses])],
+            self._relu(self._tf_idf([str(get(course, "course_title")) for course in courses]) @ w["title_kernel"] + w["title_bias"]),
+            self._relu(self._relu(numerical @ w["numerical_kernel1"] + w["numerical_bias1"]) @ w["numerical_kernel2"] + w["numerical_bias2"]),
+        ], axis=1)
+
+        x = self._relu(concat @ w["final_kernel1"] + w["final_bias1"])
+        return (x @ w["final_kernel2"] + w["final_bias2"]).astype(np.float32)
@@ -0,0 +1,145 @@
+import numpy as np
+
+from app.config import Config
+from app.services.course.hydrate import hydrate_courses
+from app.services.recommender.contentbased_model import ContentBasedModel
+from app.services.recommender.top_k import top_k
+from app.services.recommender.user_fold_in import get_user_profile
+
+# Row alignment of the last (content-based, collaborative) artifacts pair
+_alignment = None
+
+def get_row_alignment(content_artifacts, collaborative_artifacts):
+    """
+    Map candidate rows between the content-based and collaborative models.
+
+    Both models index the same catalog in a different row order. The mapping
+    is computed once per pair of model versions.
+
+    Args:
+        content_artifacts (ContentBasedArtifacts): The content-based model version.
+        collaborative_artifacts (CollaborativeArtifacts): The collaborative model version.
+
+    Returns:
+        Tuple of (collaborative row of each content row, content row of each
+        collaborative row), with -1 for courses the other model does not know.
+    """
+    global _alignment
+
+    alignment = _alignment
+    if alignment is None or alignment[0] is not content_artifacts or alignment[1] is not collaborative_artifacts:
+        to_collaborative = np.array([
+            collaborative_artifacts.row_by_course_id.get(str(course_id), -1)
+            for course_id in content_artifacts.candidate_ids
+        ], dtype=np.intp)
+        to_content = np.full(len(collaborative_artifacts.candidate_ids), -1, dtype=np.intp)
+        known = to_collaborative >= 0
+        to_content[to_collaborative[known]] = np.flatnonzero(known)
+
+        alignment = (content_artifacts, collaborative_artifacts, to_collaborative, to_content)
+        _alignment = alignment
+
+    return alignment[2], alignment[3]
+
+def get_content_weight(n_interactions):
+    """
+    Get the weight of the content-based scores for a user.
+
+    Content similarity carries users with few interactions, whose collaborative
+    embedding says little, and fades towards HYBRID_CONTENT_WEIGHT, halving its
+    extra weight every HYBRID_CONTENT_WEIGHT_HALF_LIFE interactions.
+
+    Args:
+        n_interactions (int): The number of interactions of the user.
+
+    Returns:
+        float: The content weight in [HYBRID_CONTENT_WEIGHT, 1]. The
+        collaborative weight is 1 minus it.
+    """
+    base = Config.HYBRID_CONTENT_WEIGHT
+    return base + (1 - base) * 0.5 ** (n_interactions / Config.HYBRID_CONTENT_WEIGHT_HALF_LIFE)
+
+def _normalise(scores):
+    # Min-max scale so scores of the two models are comparable
+    low, high = scores.min(), scores.max()
+    return (scores - low) / (high - low) if high > low else np.zeros_like(scores)
+
+def get_hybrid_recommendations(user, n, content_weight=None):
+    """
+    Get recommendations for a user that fuse content-based and collaborative scores.
+
+    Candidates are pulled from both indexes. The content-based query is the
+    weighted mean embedding of the courses the user interacted with. The
+    collaborative query is the user's trained embedding, or their folded-in
+    one, which is the popularity prior for users without interactions. Both score sets are computed for every candidate on row-aligned
+    arrays, normalised, and fused with the content weight. Courses the user
+    already interacted with are left out.
+
+    Args:
+        user (dict): The user, as returned by `get_user_by_username`.
+        n (int): The number of recommendations to return.
+        content_weight (float): Weight of the content-based scores in [0, 1].
+            Defaults to `get_content_weight` of the user's interaction count.
+
+    Returns:
+        Tuple of (recommended courses, model version used). Each course has
+        its fused 'score'. The version combines both model versions.
+    """
+    content_model = ContentBasedModel()
+    content_artifacts = content_model.artifacts
+    profile = get_user_profile(user['id'])
+    collaborative_artifacts = profile.artifacts
+    to_collaborative, to_content = get_row_alignment(content_artifacts, collaborative_artifacts)
+
+    # Collaborative query: trained embedding, else folded in or the popularity prior
+    user_row = collaborative_artifacts.row_by_user_id.get(f"user_{user['id']}")
+    if user['used_in_collaborative'] and user_row is not None:
+        collaborative_query = collaborative_artifacts.user_embeddings[user_row]
+    else:
+        collaborative_query = profile.embedding
+
+    # Content query: weighted mean of the interacted courses
+    interacted = [
+        (content_artifacts.row_by_course_id[course_id], weight)
+        for course_id, weight in zip(profile.course_ids, profile.weights)
+        if course_id in content_artifacts.row_by_course_id
+    ]
+    if interacted:
+        rows, weights = zip(*interacted)
+        content_query = np.average(content_artifacts.candidate_embeddings[list(rows)], axis=0, weights=weights)
+        exclude_rows = np.unique(rows)
+    else:
+        content_query = None
+        exclude_rows = np.empty(0, dtype=np.intp)
+
+    if content_query is None:
+        content_weight = 0.0
+    elif content_weight is None:
+        content_weight = get_content_weight(len(profile.course_ids))
+
+    # Pull candidates from both indexes, in content row space
+    depth = max(n, Config.HYBRID_CANDIDATES) + len(exclude_rows)
+    _, collaborative_rows = collaborative_artifacts.index.search(collaborative_query[None, :], depth)
+    candidates = to_content[collaborative_rows[0]]
+    if content_query is not None:
+        _, content_rows = content_artifacts.index.search(content_query[None, :], depth)
+        candidates = np.concatenate([candidates, content_rows[0]])
+    candidates = np.setdiff1d(candidates[candidates >= 0], exclude_rows)
+    version = f"{content_artifacts.version}+{collaborative_artifacts.version}"
+    if not len(candidates):
+        return [], version
+
+    # Score every candidate with both models on the aligned arrays
+    collaborative_candidates = to_collaborative[candidates]
+    collaborative_scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+    known = collaborative_candidates >= 0
+    collaborative_scores[known] = collaborative_artifacts.candidate_embeddings[collaborative_candidates[known]] @ collaborative_query
+    collaborative_scores[~known] = collaborative_scores[known].min() if known.any() else 0
+    scores = (1 - content_weight) * _normalise(collaborative_scores)
+    if content_query is not None:
+        scores += content_weight * _normalise(content_artifacts.candidate_embeddings[candidates] @ content_query)
+
+    scores, order = top_k(scores, n)
+    courses = hydrate_courses(content_artifacts.candidate_ids[candidates[order]].tolist(), scores)
+
+    return courses, version
@@ -0,0 +1,134 @@
+import copy
+import time
+import traceback
+from pathlib import Path
+from threading import Thread
+
+from app.services.recommender.artifacts import get_model_version
+from app.services.recommender.batching import ProcessLocalThread
+
+def get_files_signature(*paths):
+    """
+    Get a cheap fingerprint of a set of artifact files.
+
+    Unlike `get_model_version` nothing is read, only stat'ed, so it can be
+    polled often to notice that the files changed.
+
+    Args:
+        *paths (Path): Artifact files or directories.
+
+    Returns:
+        tuple: (path, size, mtime) of every file, in path order.
+    """
+    signature = []
+    for path in paths:
+        path = Path(path)
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            stat = file.stat()
+            signature.append((str(file), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+class HotSwappableModel:
+    """
+    Mixin for recommender singletons that serve an immutable artifacts snapshot.
+
+    The current snapshot lives in `artifacts` and is replaced with a single
+    attribute assignment. Requests read it once and keep using their copy, so
+    in-flight requests finish on the version they started with while a reload
+    builds the next one.
+
+    Subclasses set `_reload_lock` and implement `_get_artifact_paths` and
+    `_load_artifacts`.
+    """
+    artifacts = None
+    _signature = None
+
+    def _get_artifact_paths(self):
+        """
+        Returns:
+            list[Path]: The model files the version is computed from.
+        """
+        raise NotImplementedError
+
+    def _load_artifacts(self, version):
+        """
+        Build the artifacts snapshot of the model files currently on disk.
+        """
+        raise NotImplementedError
+
+    def reload(self):
+        """
+        Swap in the model files on disk if they changed since the last load.
+
+        Returns:
+            bool: Whether a new model version was swapped in.
+        """
+        with self._reload_lock:
+            paths = self._get_artifact_paths()
+            signature = get_files_signature(*paths)
+            if signature == self._signature:
+                return False
+
+            version = get_model_version(*paths)
+            swapped = self.artifacts is None or version != self.artifacts.version
+            if swapped:
+                self.artifacts = self._load_artifacts(version)
+
+            # Only remembered once loaded, so a failed load is retried
+            self._signature = signature
+            return swapped
+
+    def _replace_artifacts(self, artifacts, **changes):
+        """
+        Swap in a copy of `artifacts` with some fields replaced, e.g. a rebuilt
+        table, rather than modifying a snapshot requests may be using. Nothing
+        happens if a reload replaced `artifacts` in the meantime.
+        """
+        with self._reload_lock:
+            if self.artifacts is artifacts:
+                replaced = copy.copy(artifacts)
+                replaced.__dict__.update(changes)
+                self.artifacts = replaced
+
+    def reload_in_background(self):
+        """
+        Start a `reload` in a background thread and return immediately.
+        """
+        Thread(target=self._reload_logged, name=f"{type(self).__name__}-reload", daemon=True).start()
+
+    def _reload_logged(self):
+        try:
+            if self.reload():
+                print(f"{type(self).__name__} reloaded to model version {self.artifacts.version}.")
+        except Exception:
+            print(f"{type(self).__name__} reload failed, still serving model version {self.artifacts.version}.")
+            traceback.print_exc()
+
+class ReloadWatcher:
+    """
+    Poll the model files of recommender singletons and reload changed ones.
+    """
+
+    def __init__(self, get_models, interval):
+        """
+        Args:
+            get_models (callable): Returns the models to watch. Called on every
+                poll, so models are only instantiated once they are.
+            interval (float): Seconds between polls.
+        """
+        self._get_models = get_models
+        self._interval = interval
+        self._thread = ProcessLocalThread(self._watch, name="recommender-reload-watcher")
+
+    def ensure_started(self):
+        """
+        Start the polling thread of this process if it is not running yet.
+        """
+        self._thread.ensure_started()
+
+    def _watch(self):
+        while True:
+            time.sleep(self._interval)
+            for model in self._get_models():
+                model._reload_logged()
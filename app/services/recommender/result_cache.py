@@ -0,0 +1,168 @@
+import json
+import time
+import uuid
+from threading import Lock
+
+import redis
+
+from app.config import Config
+from app.services.course.catalog_cache import get_catalog
+
+# Deletes the lock only if this worker still holds it, so an expired lock
+# taken over by another worker is not released by the slow one
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_redis_client = None
+_redis_lock = Lock()
+
+# In-process fallback when Redis is not configured
+_cache = {}
+_cache_lock = Lock()
+_key_locks = {}
+
+def _get_redis():
+    global _redis_client
+
+    if not Config.RESULT_CACHE_REDIS_URL:
+        return None
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    Config.RESULT_CACHE_REDIS_URL,
+                    socket_timeout=Config.RESULT_CACHE_SOCKET_TIMEOUT,
+                    socket_connect_timeout=Config.RESULT_CACHE_SOCKET_TIMEOUT,
+                )
+    return _redis_client
+
+def get_result_cache_key(endpoint, model_version, query, n):
+    """
+    Build the cache key of a recommender response.
+
+    The catalog version is part of the key too, so course details embedded in
+    cached responses never outlive a catalog change.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. 'recommender1'.
+        model_version (str): Version of the model that computes the response.
+        query: The query, e.g. a course_id or user_id.
+        n (int): The number of recommendations.
+
+    Returns:
+        str: The cache key.
+    """
+    return f"nc_api:recommendations:{endpoint}:{model_version}:{get_catalog().version}:{query}:{n}"
+
+def get_cached_recommendations(endpoint, model_version, query, n, compute):
+    """
+    Get a recommender response from the shared result cache, computing it once on a miss.
+
+    Responses are cached in Redis for RESULT_CACHE_TTL seconds, so all workers
+    share them. On a miss exactly one caller computes the response while holding
+    a lock key, and concurrent callers of the same key wait for its result
+    instead of computing it again. Without Redis the cache and the lock are
+    per worker. If Redis fails the response is computed uncached.
+
+    Args:
+        endpoint (str): The endpoint name, e.g. 'recommender1'.
+        model_version (str): Version of the model `compute` is expected to use.
+        query: The query, e.g. a course_id or user_id.
+        n (int): The number of recommendations.
+        compute (callable): Computes the response, returning a tuple of
+            (courses, model version used).
+
+    Returns:
+        Tuple of (recommended courses, model version used).
+    """
+    if Config.RESULT_CACHE_TTL <= 0:
+        return compute()
+
+    key = get_result_cache_key(endpoint, model_version, query, n)
+    client = _get_redis()
+    if client is None:
+        return _get_or_compute_local(key, model_version, compute)
+
+    try:
+        return _get_or_compute_redis(client, key, model_version, compute)
+    except redis.RedisError as e:
+        print(f"Result cache unavailable, computing {endpoint} uncached: {e}")
+        return compute()
+
+def _get_or_compute_redis(client, key, model_version, compute):
+    value = client.get(key)
+    if value is not None:
+        return _decode(value)
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    lock_timeout = Config.RESULT_CACHE_LOCK_TIMEOUT
+    if client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)):
+        try:
+            result = compute()
+            # A model swapped in during compute answers under another key
+            if result[1] == model_version:
+                client.set(key, _encode(result), px=int(Config.RESULT_CACHE_TTL * 1000))
+            return result
+        finally:
+            client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    # Another worker is computing it, wait for its result until the lock expires
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(Config.RESULT_CACHE_POLL_INTERVAL)
+        value = client.get(key)
+        if value is not None:
+            return _decode(value)
+        if not client.exists(lock_key):
+            break
+
+    # The lock holder failed or gave up
+    return compute()
+
+def _get_or_compute_local(key, model_version, compute):
+    result = _get_local(key)
+    if result is not None:
+        return result
+
+    with _cache_lock:
+        key_lock = _key_locks.setdefault(key, Lock())
+    try:
+        with key_lock:
+            # Computed by another thread while this one waited
+            result = _get_local(key)
+            if result is not None:
+                return result
+
+            result = compute()
+            if result[1] == model_version:
+                with _cache_lock:
+                    # Bound the cache by dropping the oldest entries first
+                    while len(_cache) >= Config.RESULT_CACHE_SIZE:
+                        _cache.pop(next(iter(_cache)))
+                    _cache[key] = (_encode(result), time.monotonic() + Config.RESULT_CACHE_TTL)
+            return result
+    finally:
+        with _cache_lock:
+            if _key_locks.get(key) is key_lock:
+                del _key_locks[key]
+
+def _get_local(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry and entry[1] > time.monotonic():
+        return _decode(entry[0])
+    return None
+
+def _encode(result):
+    courses, model_version = result
+    return json.dumps({'courses': courses, 'model_version': model_version})
+
+def _decode(value):
+    # Decoded per hit, so callers can never modify a cached response
+    result = json.loads(value)
+    return result['courses'], result['model_version']
@@ -0,0 +1,58 @@
+import numpy as np
+
+def top_k(scores, k):
+    """
+    Select the k highest scores along the last axis.
+
+    Uses argpartition so only the k winners are sorted, which keeps the
+    cost linear in the number of candidates.
+
+    Args:
+        scores (np.ndarray): Scores of shape (n_candidates,) or (n_queries, n_candidates).
+        k (int): The number of results to keep per query.
+
+    Returns:
+        Tuple of (top_scores, top_indices), both sorted by descending score.
+    """
+    scores = np.asarray(scores)
+    n_candidates = scores.shape[-1]
+    k = max(0, min(int(k), n_candidates))
+
+    if k == 0:
+        candidates = np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    elif k < n_candidates:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n_candidates), scores.shape).copy()
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind='stable')
+
+    return np.take_along_axis(candidate_scores, order, axis=-1), np.take_along_axis(candidates, order, axis=-1)
+
+def top_k_neighbours(embeddings, k, block_size=1024):
+    """
+    Compute the k highest-scoring rows for every row of an embedding matrix.
+
+    Rows are scored in blocks so the full (n x n) score matrix is never held
+    in memory at once.
+
+    Args:
+        embeddings (np.ndarray): Embeddings of shape (n, embedding_dim).
+        k (int): The number of neighbours to keep per row.
+        block_size (int): The number of query rows scored per matrix product.
+
+    Returns:
+        np.ndarray: int32 array of shape (n, k) with neighbour rows sorted by
+        descending dot-product score.
+    """
+    embeddings = np.asarray(embeddings)
+    k = min(int(k), len(embeddings))
+    neighbours = np.empty((len(embeddings), k), dtype=np.int32)
+
+    for start in range(0, len(embeddings), block_size):
+        block = embeddings[start:start + block_size]
+        _, rows = top_k(block @ embeddings.T, k)
+        neighbours[start:start + len(block)] = rows
+
+    return neighbours
@@ -0,0 +1,88 @@
+import time
+from threading import Lock
+
+from sqlalchemy import func
+
+from app.config import Config
+from app.extensions import db
+from app.models.user_interaction import UserInteraction
+from app.services.recommender.collaborative_model import CollaborativeModel
+
+# How much each interaction type pulls a folded-in user towards the course
+INTERACTION_WEIGHTS = {
+    'view': 1.0,
+    'enrolled': 2.0,
+    'complete': 3.0,
+    'buy': 3.0,
+}
+DEFAULT_INTERACTION_WEIGHT = 1.0
+
+class UserProfile:
+    """
+    The interactions of a user and their folded-in collaborative embedding.
+    """
+
+    def __init__(self, course_ids, weights, embedding, artifacts):
+        self.course_ids = course_ids
+        self.weights = weights
+        self.embedding = embedding
+        self.artifacts = artifacts
+
+_cache = {}
+_cache_lock = Lock()
+
+def get_user_profile(user_id):
+    """
+    Get the interactions of a user and their folded-in collaborative embedding.
+
+    Profiles are cached per user until COLD_START_CACHE_TTL expires, the user
+    logs or deletes an interaction, or a new model version is swapped in.
+    Interaction changes are noticed by every worker, through the count and
+    latest id of the user's interactions checked on each call.
+
+    :param user_id: ID of the user (users.id)
+    :return: A UserProfile. If the user has no interactions with courses known
+        to the collaborative model, its embedding is the model's popularity prior.
+    """
+    model = CollaborativeModel()
+    artifacts = model.artifacts
+
+    # Changes with every logged or deleted interaction, whichever worker handled it
+    stamp = tuple(
+        db.session.query(func.count(UserInteraction.id), func.max(UserInteraction.id))
+        .filter(UserInteraction.user_id == user_id).one()
+    )
+    
+    with _cache_lock:
+        entry = _cache.get(user_id)
+    if entry and entry[0].artifacts is artifacts and entry[1] > time.monotonic() and entry[2] == stamp:
+        return entry[0]
+
+    interactions = UserInteraction.query.filter_by(user_id=user_id).all()
+    course_ids = [interaction.course_id for interaction in interactions]
+    weights = [
+        INTERACTION_WEIGHTS.get(interaction.interaction_type, DEFAULT_INTERACTION_WEIGHT)
+        for interaction in interactions
+    ]
+    embedding = model.fold_in_user(course_ids, weights, artifacts)
+    if embedding is None:
+        # Nothing to fold in yet, start from what is popular in the catalog
+        embedding = model.get_prior_embedding(artifacts)
+    profile = UserProfile(course_ids, weights, embedding, artifacts)
+
+    with _cache_lock:
+        # Bound the cache by dropping the oldest entries first
+        while len(_cache) >= Config.COLD_START_CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[user_id] = (profile, time.monotonic() + Config.COLD_START_CACHE_TTL, stamp)
+
+    return profile
+
+def invalidate_user_profile(user_id):
+    """
+    Drop the cached profile of a user, e.g. after their interactions changed.
+
+    :param user_id: ID of the user (users.id)
+    """
+    with _cache_lock:
+        _cache.pop(user_id, None)
@@ -1,7 +1,8 @@
 from app.models.user_interaction import UserInteraction
 from app.models.user import User
-from app.models.course import Course
 from app.extensions import db
+from app.services.course.catalog_cache import get_course_record
+from app.services.recommender.user_fold_in import invalidate_user_profile
 
 from sqlalchemy.exc import IntegrityError
 
@@ -18,8 +19,8 @@ def add_user_interaction(user_id, course_id, interaction_type):
     if not user:
         raise ValueError(f"User with ID {user_id} does not exist.")
     
-    # Use filter_by() to query by course_id (not the primary key)
-    course = Course.query.filter_by(course_id=course_id).first()
+    # Look the course up by course_id (not the primary key) in the cached catalog
+    course = get_course_record(course_id)
     if not course:
         raise ValueError(f"Course with course_id {course_id} does not exist.")
     
@@ -27,6 +28,7 @@ def add_user_interaction(user_id, course_id, interaction_type):
     try:
         db.session.add(interaction)
         db.session.commit()
+        invalidate_user_profile(user_id)
         return interaction
     except IntegrityError:
         db.session.rollback()  # Rollback the transaction to avoid leaving it in a broken state
@@ -65,6 +67,7 @@ def delete_user_interaction_by_id(interaction_id):
     
     db.session.delete(interaction)
     db.session.commit()
+    invalidate_user_profile(interaction.user_id)
     return f"Interaction with ID {interaction_id} has been deleted."
 
 def delete_user_interactions_by_user_id(user_id):
@@ -82,4 +85,5 @@ def delete_user_interactions_by_user_id(user_id):
         db.session.delete(interaction)
     
     db.session.commit()
+    invalidate_user_profile(user_id)
     return f"All interactions for user with ID {user_id} have been deleted."
\ No newline at end of file